@@ -1,14 +1,34 @@
+import hashlib
+import threading
+import time
 from functools import wraps
+from urllib.parse import urlencode
 
 import requests
+from clerk_app.services import get_or_create_budgetbox_user
 from clerk_backend_api import Clerk
+from clerk_backend_api.models import ClerkErrors
 from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
 from jose import jwk, jwt
+from jose.exceptions import JWTError
 from jwt import PyJWTError
 from rest_framework import status as s
 from rest_framework.response import Response
 
-from budgetbox_project.settings import CLERK_ISSUER, CLERK_JWKS_URLS, CLERK_SECRET_KEY
+from budgetbox_project.lru import LRUCache
+from budgetbox_project.settings import (
+    CLERK_ISSUER,
+    CLERK_JWKS_CACHE_TTL,
+    CLERK_JWKS_MIN_REFRESH_INTERVAL,
+    CLERK_JWKS_URLS,
+    CLERK_SECRET_KEY,
+    CLERK_USER_CACHE_SIZE,
+    CLERK_USER_CACHE_TTL,
+    CLERK_USER_NEGATIVE_CACHE_TTL,
+    CLERK_VERIFY_USER_EXISTS,
+)
 
 
 # NOTE: Fetches JSON Web Key Set from Clerk's JWKS endpoint for JWT verification
@@ -18,13 +38,94 @@ def get_jwks():
     return response.json()
 
 
-# NOTE: Extracts the correct public key from JWKS using the key ID (kid) from JWT header
+class JWKSCache:
+    """
+    In-process cache of Clerk's signing keys, parsed once into `jwk` objects.
+
+    Keys are refetched when the TTL expires, or when a token carries a `kid`
+    we have not seen (key rotation). Unknown-kid refetches are rate limited so
+    a stream of bad tokens cannot turn into a stream of requests to Clerk.
+    """
+
+    def __init__(self, fetch, ttl, min_refresh_interval):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._keys = {}
+        self._fetched_at = None
+        self._last_refresh_attempt = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def _is_expired(self, now):
+        return self._fetched_at is None or now - self._fetched_at >= self.ttl
+
+    def _can_refresh(self, now):
+        return (
+            self._last_refresh_attempt is None
+            or now - self._last_refresh_attempt >= self.min_refresh_interval
+        )
+
+    def _refresh(self, now):
+        self._last_refresh_attempt = now
+        try:
+            jwks = self._fetch()
+        except requests.RequestException:
+            # NOTE: Keep serving the keys we already have if Clerk is unreachable
+            self.refresh_errors += 1
+            if not self._keys:
+                raise
+            return
+        self._keys = {key["kid"]: jwk.construct(key) for key in jwks["keys"]}
+        self._fetched_at = now
+        self.refreshes += 1
+
+    def get_key(self, kid):
+        with self._lock:
+            now = time.monotonic()
+            key = self._keys.get(kid)
+            if key is not None and not self._is_expired(now):
+                self.hits += 1
+                return key
+
+            self.misses += 1
+            if self._can_refresh(now):
+                self._refresh(now)
+                key = self._keys.get(kid)
+
+        if key is None:
+            raise ValueError("Invalid Token")
+        return key
+
+    def clear(self):
+        with self._lock:
+            self._keys = {}
+            self._fetched_at = None
+            self._last_refresh_attempt = None
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "keys": len(self._keys),
+        }
+
+
+jwks_cache = JWKSCache(
+    get_jwks,
+    ttl=CLERK_JWKS_CACHE_TTL,
+    min_refresh_interval=CLERK_JWKS_MIN_REFRESH_INTERVAL,
+)
+
+
+# NOTE: Extracts the correct public key from the cached JWKS using the key ID (kid) from JWT header
 def get_public_keys(kid):
-    jwks = get_jwks()
-    for key in jwks["keys"]:
-        if key["kid"] == kid:
-            return jwk.construct(key)
-    raise ValueError("Invalid Token")
+    return jwks_cache.get_key(kid)
 
 
 # NOTE: Decodes and verifies JWT token using RS256 algorithm with Clerk's public key
@@ -35,17 +136,53 @@ def decode_token(token):
         public_key = get_public_keys(key_id)
         payload = jwt.decode(
             token,
-            public_key.to_pem().decode("utf-8"),
+            public_key,
             algorithms=["RS256"],
             audience="clerk",
             issuer=CLERK_ISSUER,
         )
         return payload
-    except PyJWTError as e:
+    except (JWTError, PyJWTError, KeyError) as e:
         raise ValueError(f"Token verification failed: {str(e)}") from e
 
 
-# NOTE: Decorator that validates Clerk JWT tokens and adds clerk_user_id to request object
+_clerk_client = None
+_clerk_client_lock = threading.Lock()
+
+# NOTE: Maps Clerk user id -> bool (exists). Revoked users are cached too, for longer
+clerk_user_cache = LRUCache(maxsize=CLERK_USER_CACHE_SIZE, ttl=CLERK_USER_CACHE_TTL)
+
+
+# NOTE: One Clerk SDK client per process so its HTTP connection pool is reused
+def get_clerk_client():
+    global _clerk_client
+    if _clerk_client is None:
+        with _clerk_client_lock:
+            if _clerk_client is None:
+                _clerk_client = Clerk(bearer_auth=CLERK_SECRET_KEY)
+    return _clerk_client
+
+
+# NOTE: Confirms the user still exists in Clerk, consulting the positive/negative cache first
+def clerk_user_exists(user_id):
+    exists = clerk_user_cache.get(user_id)
+    if exists is not None:
+        return exists
+
+    try:
+        get_clerk_client().users.get(user_id=user_id)
+    except ClerkErrors as e:
+        if e.status_code != 404:
+            raise
+        clerk_user_cache.set(user_id, False, ttl=CLERK_USER_NEGATIVE_CACHE_TTL)
+        return False
+
+    clerk_user_cache.set(user_id, True)
+    return True
+
+
+# NOTE: Decorator that validates Clerk JWT tokens and adds clerk_user_id and the resolved
+# budgetbox_user to the request object
 def clerk_auth_required(view_func):
     @wraps(view_func)
     def wrapped_view(self, request, *args, **kwargs):
@@ -74,16 +211,77 @@ def clerk_auth_required(view_func):
                     {"Error": "user_id not found in token."},
                     status=s.HTTP_404_NOT_FOUND,
                 )
-            # NOTE: Verify token with Clerk SDK and extract user details for request
-            clerk_sdk = Clerk(bearer_auth=CLERK_SECRET_KEY)
-            user_details = clerk_sdk.users.get(user_id=user_id)
-            request.clerk_user_id = user_details.id
+            # NOTE: The signature check above already proves who the caller is; only ask
+            # Clerk whether the user still exists when explicitly configured to
+            if CLERK_VERIFY_USER_EXISTS and not clerk_user_exists(user_id):
+                return JsonResponse(
+                    {"error": "User not found"},
+                    status=s.HTTP_401_UNAUTHORIZED,
+                )
+            request.clerk_user_id = user_id
+            request.budgetbox_user = get_or_create_budgetbox_user(user_id)
 
         except ValueError as e:
             return JsonResponse(
-                {"error": {str: e}},
+                {"error": str(e)},
                 status=s.HTTP_401_UNAUTHORIZED,
             )
         return view_func(self, request, *args, **kwargs)
 
     return wrapped_view
+
+
+def _etag(request, version):
+    # NOTE: The representation also depends on the query string, so it is part of the tag
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    digest = hashlib.sha256(f"{version}|{query}".encode()).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def _set_validators(response, etag, last_modified):
+    if etag:
+        response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    # NOTE: Responses are per user; browsers may keep them but must revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ["Authorization"])
+    return response
+
+
+def conditional_get(get_validators):
+    """
+    Conditional GET for per-user reads. Must be applied below
+    `clerk_auth_required`, which resolves `request.budgetbox_user`.
+
+    `get_validators(request)` returns `(version, last_modified)`: any value that
+    changes whenever the response would, and a datetime (either may be None).
+    They should come from one cheap query so that If-None-Match and
+    If-Modified-Since can be answered with a 304 before the view runs its
+    queries and serialization.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped_view(self, request, *args, **kwargs):
+            version, last_modified = get_validators(request)
+            # NOTE: cached_response keys bodies on this, so a changed row is a miss
+            # in every process, not only in the one that saw the write
+            request.conditional_version = version
+            etag = _etag(request, version) if version is not None else None
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            not_modified = get_conditional_response(
+                request, etag=etag, last_modified=timestamp
+            )
+            if not_modified is not None:
+                return _set_validators(not_modified, etag, timestamp)
+
+            response = view_func(self, request, *args, **kwargs)
+            if response.status_code == s.HTTP_200_OK:
+                _set_validators(response, etag, timestamp)
+            return response
+
+        return wrapped_view
+
+    return decorator
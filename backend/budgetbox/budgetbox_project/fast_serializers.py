@@ -0,0 +1,118 @@
+from decimal import Decimal
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+
+def _passthrough(field):
+    return None
+
+
+def _decimal_converter(field):
+    coerce_to_string = getattr(
+        field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING
+    )
+    if not coerce_to_string or field.normalize_output or field.localize:
+        return field.to_representation
+    quantize = field.quantize
+
+    def convert(value):
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value))
+        return f"{quantize(value):f}"
+
+    return convert
+
+
+def _date_converter(field):
+    output_format = getattr(field, "format", api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    return lambda value: value.isoformat()
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        # NOTE: Same as DRF's enforce_timezone for the aware values the database
+        # returns, with the active timezone resolved once per call instead of per value
+        if value.tzinfo is not None:
+            value = value.astimezone(field_timezone)
+        value = value.isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    return convert
+
+
+# NOTE: Converter factories per field type; a None converter means the database
+# value already is what DRF would return
+_CONVERTERS = {
+    serializers.IntegerField: _passthrough,
+    serializers.CharField: _passthrough,
+    serializers.ChoiceField: _passthrough,
+    serializers.BooleanField: _passthrough,
+    serializers.PrimaryKeyRelatedField: _passthrough,
+    serializers.DecimalField: _decimal_converter,
+    serializers.DateField: _date_converter,
+    serializers.DateTimeField: _datetime_converter,
+}
+
+
+class FastReadSerializer:
+    """
+    Read-only fast path for a DRF ModelSerializer on hot list endpoints.
+
+    The serializer's fields are resolved once into (name, lookup, field) steps and
+    turned into converters once per call (so the active timezone is honoured).
+    Rows are read with `values_list()` and turned into plain dicts, skipping model
+    instantiation and DRF's per-field attribute resolution. The output matches
+    `serializer_class(queryset, many=True).data`.
+    """
+
+    def __init__(self, serializer_class, extra=None):
+        self.serializer_class = serializer_class
+        self.extra = extra or {}
+        self._plan = None
+
+    @property
+    def plan(self):
+        if self._plan is None:
+            plan = []
+            for name, field in self.serializer_class().fields.items():
+                if field.write_only:
+                    continue
+                plan.append((name, field.source.replace(".", "__"), field))
+            self._plan = plan
+        return self._plan
+
+    @property
+    def lookups(self):
+        return [lookup for _, lookup, _ in self.plan]
+
+    def serialize_rows(self, rows):
+        """Serialize `values_list(*self.lookups)` tuples."""
+        steps = []
+        for name, _, field in self.plan:
+            make_converter = _CONVERTERS.get(type(field))
+            steps.append(
+                (name, make_converter(field) if make_converter else field.to_representation)
+            )
+        extra = self.extra
+        data = []
+        for row in rows:
+            item = {
+                name: value if value is None or convert is None else convert(value)
+                for (name, convert), value in zip(steps, row)
+            }
+            item.update(extra)
+            data.append(item)
+        return data
+
+    def serialize(self, queryset):
+        return self.serialize_rows(queryset.values_list(*self.lookups))
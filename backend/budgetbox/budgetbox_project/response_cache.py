@@ -0,0 +1,155 @@
+import hashlib
+import threading
+import uuid
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework import status as s
+from rest_framework.response import Response
+
+RESPONSE_CACHE_ALIAS = "responses"
+
+# NOTE: Invalidation scopes. Each user has one generation token per scope; bumping it
+# orphans every cached response in that scope, which then ages out through LRU eviction
+BUDGET_SCOPE = "budget"
+BUDGET_LIST_SCOPE = "budgets"
+TRANSACTIONS_SCOPE = "transactions"
+
+_MISSING = object()
+_evictions = {}
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+class EvictionCountingLocMemCache(LocMemCache):
+    """
+    LocMemCache that counts entries dropped by culling. LocMemCache already
+    evicts least recently used entries first; see CACHES in settings.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._evictions = _evictions.setdefault(name, [0])
+
+    def _cull(self):
+        # NOTE: Runs with the cache lock held
+        before = len(self._cache)
+        super()._cull()
+        self._evictions[0] += before - len(self._cache)
+
+    @property
+    def evictions(self):
+        return self._evictions[0]
+
+
+def get_response_cache():
+    return caches[RESPONSE_CACHE_ALIAS]
+
+
+def _generation_key(scope, user_id):
+    return f"gen:{scope}:{user_id}"
+
+
+def _generation(cache, scope, user_id):
+    key = _generation_key(scope, user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # NOTE: A missing token (never set, or evicted) always starts a fresh
+        # namespace, so older entries can't become reachable again
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def _bump_generations(user_id, scopes):
+    cache = get_response_cache()
+    cache.set_many(
+        {_generation_key(scope, user_id): uuid.uuid4().hex for scope in scopes},
+        timeout=None,
+    )
+
+
+def invalidate_user_cache(user_id, *scopes):
+    """
+    Drop a user's cached responses in `scopes`. Invalidates right away and again
+    once the surrounding transaction commits, so a read racing the write can't
+    re-cache data from before the commit.
+    """
+    if not user_id or not scopes:
+        return
+    _bump_generations(user_id, scopes)
+    transaction.on_commit(lambda: _bump_generations(user_id, scopes))
+
+
+def response_cache_key(request, scope):
+    cache = get_response_cache()
+    user_id = request.budgetbox_user.id
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    version = getattr(request, "conditional_version", None)
+    digest = hashlib.sha256(f"{version}|{query}".encode()).hexdigest()[:32]
+    return f"resp:{scope}:{user_id}:{_generation(cache, scope, user_id)}:{digest}"
+
+
+def cached_response(scope):
+    """
+    Cache successful responses of a per-user GET, keyed on the user, the scope's
+    current generation and the sorted query string. Must be applied below
+    `clerk_auth_required`. Writes invalidate through `invalidate_user_cache`.
+
+    Below `conditional_get`, the key also includes the validator version it
+    computed from the database. Generations live in the cache backend, so with
+    the default per-process LocMemCache a write only bumps them in the process
+    that made it; the version makes every other process miss as well, and keeps
+    bodies consistent with the ETag they are served under. When the validators
+    return no version (nothing to version yet, e.g. a budget the view is about
+    to create), the response isn't cached at all.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped_view(self, request, *args, **kwargs):
+            if getattr(request, "conditional_version", _MISSING) is None:
+                return view_func(self, request, *args, **kwargs)
+
+            cache = get_response_cache()
+            key = response_cache_key(request, scope)
+
+            data = cache.get(key, _MISSING)
+            with _stats_lock:
+                _stats["hits" if data is not _MISSING else "misses"] += 1
+            if data is not _MISSING:
+                response = Response(data, status=s.HTTP_200_OK)
+                response.headers["X-Cache"] = "HIT"
+                return response
+
+            response = view_func(self, request, *args, **kwargs)
+            if response.status_code == s.HTTP_200_OK:
+                cache.set(key, response.data)
+                response.headers["X-Cache"] = "MISS"
+            return response
+
+        return wrapped_view
+
+    return decorator
+
+
+def response_cache_stats():
+    cache = get_response_cache()
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        "evictions": getattr(cache, "evictions", None),
+    }
+
+
+def reset_response_cache():
+    get_response_cache().clear()
+    with _stats_lock:
+        _stats["hits"] = _stats["misses"] = 0
@@ -29,8 +29,44 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 CLERK_SECRET_KEY = os.getenv("CLERK_SECRET_KEY")
 CLERK_ISSUER = os.getenv("CLERK_ISSUER")
 CLERK_JWKS_URLS = os.getenv("CLERK_JWKS_URL")
+# NOTE: How long fetched JWKS keys are trusted, and the minimum gap between
+# refetches triggered by tokens carrying an unknown `kid`
+CLERK_JWKS_CACHE_TTL = int(os.getenv("CLERK_JWKS_CACHE_TTL", "3600"))
+CLERK_JWKS_MIN_REFRESH_INTERVAL = int(os.getenv("CLERK_JWKS_MIN_REFRESH_INTERVAL", "30"))
+# NOTE: By default the verified JWT `sub` is trusted as-is. Set CLERK_VERIFY_USER_EXISTS
+# to also confirm the user with Clerk; results are cached for the TTLs below
+CLERK_VERIFY_USER_EXISTS = os.getenv("CLERK_VERIFY_USER_EXISTS", "False").lower() in ("1", "true", "yes")
+CLERK_USER_CACHE_SIZE = int(os.getenv("CLERK_USER_CACHE_SIZE", "10000"))
+CLERK_USER_CACHE_TTL = int(os.getenv("CLERK_USER_CACHE_TTL", "60"))
+CLERK_USER_NEGATIVE_CACHE_TTL = int(os.getenv("CLERK_USER_NEGATIVE_CACHE_TTL", "300"))
+# NOTE: Per-process cache of resolved BudgetBoxUser rows keyed by Clerk user id
+BUDGETBOX_USER_CACHE_SIZE = int(os.getenv("BUDGETBOX_USER_CACHE_SIZE", "10000"))
+BUDGETBOX_USER_CACHE_TTL = int(os.getenv("BUDGETBOX_USER_CACHE_TTL", "300"))
 PLAID_SANDBOX_KEY = os.getenv("PLAID_SANDBOX_KEY")
 PLAID_CLIENT_ID = os.getenv("PLAID_CLIENT_ID")
+# NOTE: Upper bound on Plaid items synced in parallel by one request or worker
+PLAID_SYNC_MAX_WORKERS = int(os.getenv("PLAID_SYNC_MAX_WORKERS", "4"))
+# NOTE: A running sync job whose accounts report no progress for this many seconds
+# is taken to have lost its worker (crash, deploy) and is failed, freeing its accounts
+PLAID_SYNC_JOB_STALE_AFTER = int(os.getenv("PLAID_SYNC_JOB_STALE_AFTER", "900"))
+# NOTE: Plaid API client (see plaid_app/client.py). PLAID_ENV is "sandbox",
+# "production" or a base URL (e.g. the local fake started by `fake_plaid_server`);
+# PLAID_SECRET falls back to the sandbox key. Timeouts are in seconds
+# and retryable errors are retried with jittered exponential backoff.
+PLAID_ENV = os.getenv("PLAID_ENV", "sandbox")
+PLAID_SECRET = os.getenv("PLAID_SECRET", PLAID_SANDBOX_KEY)
+PLAID_POOL_SIZE = int(os.getenv("PLAID_POOL_SIZE", str(max(10, PLAID_SYNC_MAX_WORKERS * 2))))
+PLAID_CONNECT_TIMEOUT = float(os.getenv("PLAID_CONNECT_TIMEOUT", "5"))
+PLAID_READ_TIMEOUT = float(os.getenv("PLAID_READ_TIMEOUT", "30"))
+PLAID_MAX_RETRIES = int(os.getenv("PLAID_MAX_RETRIES", "4"))
+PLAID_RETRY_BACKOFF = float(os.getenv("PLAID_RETRY_BACKOFF", "0.5"))
+PLAID_RETRY_BACKOFF_MAX = float(os.getenv("PLAID_RETRY_BACKOFF_MAX", "8"))
+# NOTE: Per-user response cache for budget/transaction reads (see budgetbox_project/response_cache.py).
+# Entries are invalidated on writes; the TTL only bounds anything missed. Set
+# RESPONSE_CACHE_REDIS_URL to share one cache (and its invalidations) across processes
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv("DEBUG")
@@ -47,6 +83,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "clerk_app",
     "plaid_app",
@@ -88,6 +125,19 @@ WSGI_APPLICATION = "budgetbox_project.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# NOTE: Connection reuse. DB_CONN_MAX_AGE keeps a connection open across requests for
+# that many seconds ("none" = unlimited, 0 = reconnect per request) and
+# DB_CONN_HEALTH_CHECKS pings a reused connection before the request runs.
+# DB_POOL=true switches to psycopg 3's connection pool instead (needs
+# psycopg[pool]; Django requires CONN_MAX_AGE=0 with it, so that is forced).
+_db_conn_max_age = os.getenv("DB_CONN_MAX_AGE", "60")
+DB_CONN_MAX_AGE = None if _db_conn_max_age.lower() == "none" else int(_db_conn_max_age)
+DB_CONN_HEALTH_CHECKS = os.getenv("DB_CONN_HEALTH_CHECKS", "True").lower() in ("1", "true", "yes")
+DB_POOL = os.getenv("DB_POOL", "False").lower() in ("1", "true", "yes")
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -96,8 +146,42 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT"),
+        "CONN_MAX_AGE": 0 if DB_POOL else DB_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": DB_CONN_HEALTH_CHECKS,
+    }
+}
+if DB_POOL:
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": DB_POOL_MIN_SIZE,
+            "max_size": DB_POOL_MAX_SIZE,
+            "timeout": DB_POOL_TIMEOUT,
+        },
     }
+
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # NOTE: LocMemCache culls least recently used entries first. A cull frequency equal
+    # to MAX_ENTRIES makes it evict one entry at a time instead of a third of the cache
+    "responses": {
+        "BACKEND": "budgetbox_project.response_cache.EvictionCountingLocMemCache",
+        "LOCATION": "budgetbox-responses",
+        "TIMEOUT": RESPONSE_CACHE_TTL,
+        "OPTIONS": {
+            "MAX_ENTRIES": RESPONSE_CACHE_MAX_ENTRIES,
+            "CULL_FREQUENCY": RESPONSE_CACHE_MAX_ENTRIES,
+        },
+    },
 }
+if RESPONSE_CACHE_REDIS_URL:
+    CACHES["responses"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": RESPONSE_CACHE_REDIS_URL,
+        "TIMEOUT": RESPONSE_CACHE_TTL,
+    }
 
 
 # Password validation
@@ -147,3 +231,13 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:5173",
 ]
 CORS_ALLOW_CREDENTIALS = True
+
+# NOTE: JSON responses are encoded with orjson; set JSON_RENDERER_CLASS to
+# "rest_framework.renderers.JSONRenderer" to fall back to DRF's stdlib renderer
+JSON_RENDERER_CLASS = os.getenv("JSON_RENDERER_CLASS", "budgetbox_project.renderers.ORJSONRenderer")
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        JSON_RENDERER_CLASS,
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
@@ -17,8 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .views import ResponseCacheStats
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/cache/stats/', ResponseCacheStats.as_view(), name='response_cache_stats'),
     path('api/entries/', include('entries.urls')),
     path('api/plaid/', include('plaid_app.urls')),
 ]
@@ -0,0 +1,15 @@
+from rest_framework import status as s
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from budgetbox_project.decorators import clerk_auth_required
+from budgetbox_project.response_cache import response_cache_stats
+
+
+class ResponseCacheStats(APIView):
+    @clerk_auth_required
+    def get(self, request):
+        """Hit ratio and eviction counts of this process's response cache (staff only)."""
+        if not request.budgetbox_user.is_staff:
+            return Response({"detail": "Forbidden"}, status=s.HTTP_403_FORBIDDEN)
+        return Response(response_cache_stats(), status=s.HTTP_200_OK)
@@ -0,0 +1,45 @@
+from budgetbox_project.lru import LRUCache
+from budgetbox_project.settings import (
+    BUDGETBOX_USER_CACHE_SIZE,
+    BUDGETBOX_USER_CACHE_TTL,
+)
+
+from .models import BudgetBoxUser
+
+# NOTE: Per-process map of clerk_user_id -> the user's column values, so authenticated
+# requests don't hit the users table. Each process (gunicorn worker, sync worker) has
+# its own copy: saving or deleting a user drops the entry only in the process that
+# made the change, and other processes may serve the old row for up to
+# BUDGETBOX_USER_CACHE_TTL seconds. Keep the TTL short if user rows change often.
+user_cache = LRUCache(maxsize=BUDGETBOX_USER_CACHE_SIZE, ttl=BUDGETBOX_USER_CACHE_TTL)
+_USER_FIELDS = [field.attname for field in BudgetBoxUser._meta.concrete_fields]
+
+
+def get_or_create_budgetbox_user(clerk_user_id: str) -> BudgetBoxUser:
+    """
+    The BudgetBoxUser for `clerk_user_id`, created on first sight. Every call
+    returns a fresh instance: the cache holds plain values, never a model
+    instance shared between request threads.
+    """
+    cached = user_cache.get(clerk_user_id)
+    if cached is not None:
+        db, values = cached
+        return BudgetBoxUser.from_db(db, _USER_FIELDS, values)
+
+    user, _ = BudgetBoxUser.objects.get_or_create(
+        clerk_user_id=clerk_user_id,
+        defaults={
+            "email": f"user_{clerk_user_id}@example.com",
+            "budget_id": clerk_user_id,
+        },
+    )
+    user_cache.set(
+        clerk_user_id,
+        (user._state.db, tuple(getattr(user, name) for name in _USER_FIELDS)),
+    )
+    return user
+
+
+def invalidate_budgetbox_user(clerk_user_id: str) -> None:
+    if clerk_user_id:
+        user_cache.delete(clerk_user_id)
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import BudgetBoxUser
+from .services import invalidate_budgetbox_user
+
+
+@receiver(post_save, sender=BudgetBoxUser)
+@receiver(post_delete, sender=BudgetBoxUser)
+def drop_cached_user(sender, instance, **kwargs):
+    invalidate_budgetbox_user(instance.clerk_user_id)
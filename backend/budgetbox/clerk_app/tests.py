@@ -1 +1,124 @@
-from django.test import TestCase
+from unittest import mock
+
+import httpx
+from clerk_backend_api.models import ClerkErrors, ClerkErrorsData
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.test import SimpleTestCase, TestCase
+from jose import jwk
+
+from budgetbox_project import decorators
+from budgetbox_project.decorators import JWKSCache
+
+from .models import BudgetBoxUser
+from .services import get_or_create_budgetbox_user, user_cache
+
+
+def _make_jwk(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    key = jwk.construct(pem, "RS256").to_dict()
+    key["kid"] = kid
+    return key
+
+
+class JWKSCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.keys = [_make_jwk("kid-1")]
+        self.fetches = 0
+
+        def fetch():
+            self.fetches += 1
+            return {"keys": list(self.keys)}
+
+        self.cache = JWKSCache(fetch, ttl=3600, min_refresh_interval=3600)
+
+    def test_known_kid_is_served_from_cache(self):
+        self.cache.get_key("kid-1")
+        self.cache.get_key("kid-1")
+        self.cache.get_key("kid-1")
+
+        self.assertEqual(self.fetches, 1)
+        self.assertEqual(self.cache.stats()["hits"], 2)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_unknown_kid_refetch_is_rate_limited(self):
+        self.cache.get_key("kid-1")
+
+        for _ in range(5):
+            with self.assertRaises(ValueError):
+                self.cache.get_key("bogus")
+
+        self.assertEqual(self.fetches, 1)
+
+    def test_rotated_kid_is_picked_up_after_refresh_interval(self):
+        self.cache.min_refresh_interval = 0
+        self.cache.get_key("kid-1")
+        self.keys.append(_make_jwk("kid-2"))
+
+        self.cache.get_key("kid-2")
+
+        self.assertEqual(self.fetches, 2)
+
+
+class ClerkUserExistsTest(SimpleTestCase):
+    def setUp(self):
+        decorators.clerk_user_cache.clear()
+        self.client_mock = mock.Mock()
+        patcher = mock.patch.object(
+            decorators, "get_clerk_client", return_value=self.client_mock
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_existing_user_is_looked_up_once(self):
+        self.assertTrue(decorators.clerk_user_exists("user_1"))
+        self.assertTrue(decorators.clerk_user_exists("user_1"))
+
+        self.assertEqual(self.client_mock.users.get.call_count, 1)
+
+    def test_revoked_user_is_negatively_cached(self):
+        not_found = httpx.Response(404, request=httpx.Request("GET", "http://clerk"))
+        self.client_mock.users.get.side_effect = ClerkErrors(
+            ClerkErrorsData(errors=[]), not_found
+        )
+
+        self.assertFalse(decorators.clerk_user_exists("user_gone"))
+        self.assertFalse(decorators.clerk_user_exists("user_gone"))
+
+        self.assertEqual(self.client_mock.users.get.call_count, 1)
+
+
+class BudgetBoxUserCacheTest(TestCase):
+    def setUp(self):
+        user_cache.clear()
+
+    def test_user_is_resolved_once_per_process(self):
+        user = get_or_create_budgetbox_user("user_abc")
+
+        with self.assertNumQueries(0):
+            cached = get_or_create_budgetbox_user("user_abc")
+
+        self.assertEqual(cached.pk, user.pk)
+        self.assertEqual(user.email, "user_user_abc@example.com")
+
+    def test_cached_user_is_not_shared_between_callers(self):
+        first = get_or_create_budgetbox_user("user_abc")
+        second = get_or_create_budgetbox_user("user_abc")
+        second.email = "changed@example.com"
+
+        third = get_or_create_budgetbox_user("user_abc")
+
+        self.assertIsNot(second, third)
+        self.assertEqual(third.email, first.email)
+        self.assertFalse(third._state.adding)
+
+    def test_deleting_user_invalidates_cache(self):
+        user = get_or_create_budgetbox_user("user_abc")
+        BudgetBoxUser.objects.get(pk=user.pk).delete()
+
+        recreated = get_or_create_budgetbox_user("user_abc")
+
+        self.assertNotEqual(recreated.pk, user.pk)
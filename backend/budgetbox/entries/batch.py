@@ -0,0 +1,271 @@
+"""
+Batch writes for income and expense streams.
+
+A batch is a list of create/update/delete operations on one kind of stream.
+Every operation is validated before anything is written; if any of them fails
+nothing is applied. Valid batches are written in one database transaction with
+a bulk_create, a bulk_update and a single DELETE ... IN, and the affected
+budgets' totals are refreshed once at the end.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from budgetbox_project.response_cache import (
+    BUDGET_SCOPE,
+    TRANSACTIONS_SCOPE,
+    invalidate_user_cache,
+)
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.timezone import now
+from plaid_app.models import bump_transaction_list_version
+
+from .models import (
+    Budget,
+    ExpenseStream,
+    IncomeStream,
+    get_or_create_month_budgets,
+    refresh_budget_totals,
+)
+from .serializers import ExpanseStream_serializer, IncomeStream_serializer
+from .signals import batched_stream_writes
+
+MAX_BATCH_OPERATIONS = 500
+UPDATABLE_FIELDS = ("merchant_name", "description", "amount", "category")
+CREATE, UPDATE, DELETE = "create", "update", "delete"
+
+
+@dataclass(frozen=True)
+class StreamKind:
+    model: type
+    serializer: type
+    # NOTE: Incomes are stored positive and expenses negative, whatever the sign sent
+    sign: int
+    default_category: str
+    # NOTE: Mirrors ExpenseStreamView.post, which files every new expense under "expense"
+    fixed_category: bool = False
+
+    def signed(self, amount):
+        return abs(amount) * self.sign
+
+
+INCOME_STREAMS = StreamKind(IncomeStream, IncomeStream_serializer, 1, "salary")
+EXPENSE_STREAMS = StreamKind(
+    ExpenseStream, ExpanseStream_serializer, -1, "expense", fixed_category=True
+)
+
+
+class BatchError(Exception):
+    """The batch was rejected; `errors` lists the failing operations by index."""
+
+    def __init__(self, detail, errors=()):
+        super().__init__(detail)
+        self.detail = detail
+        self.errors = list(errors)
+
+
+def _month(raw):
+    if not raw:
+        return now().date().replace(day=1)
+    for fmt in ("%Y-%m-%d", "%Y-%m"):
+        try:
+            return datetime.strptime(str(raw), fmt).date().replace(day=1)
+        except ValueError:
+            continue
+    raise ValidationError("Expected YYYY-MM or YYYY-MM-DD")
+
+
+def _id(raw):
+    if isinstance(raw, bool):
+        raise ValidationError("Expected an integer id")
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        raise ValidationError("Expected an integer id")
+
+
+def _clean_value(kind, name, raw, supplied=True):
+    # NOTE: Runs the column's own conversion and validators (max_length,
+    # max_digits, the income minimum). Null and blank checks apply to values
+    # the client sent; the create defaults mirror the single-stream endpoints
+    field = kind.model._meta.get_field(name)
+    if raw is None and not field.null:
+        raise ValidationError(field.error_messages["null"])
+    if supplied and raw in field.empty_values and not field.blank:
+        raise ValidationError(field.error_messages["blank"])
+    value = field.to_python(raw)
+    if name == "amount":
+        value = kind.signed(value)
+    field.run_validators(value)
+    return value
+
+
+def _clean_values(kind, data, names, errors, supplied=None):
+    values = {}
+    for name in names:
+        if name not in data:
+            continue
+        try:
+            values[name] = _clean_value(
+                kind, name, data[name], supplied=supplied is None or name in supplied
+            )
+        except ValidationError as e:
+            errors[name] = e.messages
+    return values
+
+
+@dataclass
+class _Plan:
+    # (index, budget or None, month or None, field values)
+    creates: list
+    # (index, stream, field values)
+    updates: list
+    # (index, stream)
+    deletes: list
+
+
+def _validate(kind, user, operations):
+    if not isinstance(operations, list) or not operations:
+        raise BatchError("'operations' must be a non-empty list")
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise BatchError(f"A batch can hold at most {MAX_BATCH_OPERATIONS} operations")
+
+    failures = {}
+    creates, updates, deletes = [], [], []
+    seen_ids = set()
+    for index, operation in enumerate(operations):
+        errors = {}
+        if not isinstance(operation, dict):
+            failures[index] = {"op": ["Expected an object"]}
+            continue
+
+        op = operation.get("op")
+        if op == CREATE:
+            budget_id = month = None
+            try:
+                if operation.get("budget_id"):
+                    budget_id = _id(operation["budget_id"])
+                else:
+                    month = _month(operation.get("date"))
+            except ValidationError as e:
+                errors["budget_id" if "budget_id" in operation else "date"] = e.messages
+            data = {"merchant_name": "", "description": "", "amount": 0, **operation}
+            data["category"] = (
+                kind.default_category
+                if kind.fixed_category
+                else operation.get("category", kind.default_category)
+            )
+            values = _clean_values(kind, data, UPDATABLE_FIELDS, errors, supplied=operation)
+            creates.append((index, budget_id, month, values))
+        elif op in (UPDATE, DELETE):
+            stream_id = None
+            try:
+                stream_id = _id(operation.get("id"))
+            except ValidationError as e:
+                errors["id"] = e.messages
+            if stream_id is not None:
+                if stream_id in seen_ids:
+                    errors["id"] = ["Stream appears in more than one operation"]
+                seen_ids.add(stream_id)
+            if op == UPDATE:
+                values = _clean_values(kind, operation, UPDATABLE_FIELDS, errors)
+                updates.append((index, stream_id, values))
+            else:
+                deletes.append((index, stream_id))
+        else:
+            errors["op"] = [f"Expected one of '{CREATE}', '{UPDATE}', '{DELETE}'"]
+
+        if errors:
+            failures[index] = errors
+
+    # NOTE: One lookup each for the referenced budgets and streams, whatever the batch size
+    budget_ids = {budget_id for _, budget_id, _, _ in creates if budget_id is not None}
+    budgets = (
+        Budget.objects.filter(budget_box_user=user).in_bulk(budget_ids) if budget_ids else {}
+    )
+    streams = (
+        kind.model.objects.select_related("budget").in_bulk(seen_ids) if seen_ids else {}
+    )
+
+    for index, budget_id, _, _ in creates:
+        if budget_id is not None and budget_id not in budgets:
+            failures.setdefault(index, {})["budget_id"] = ["Budget not found"]
+    for index, stream_id, *_ in updates + deletes:
+        if stream_id is None:
+            continue
+        stream = streams.get(stream_id)
+        if stream is None:
+            failures.setdefault(index, {})["id"] = ["Stream not found"]
+        elif stream.budget.budget_box_user_id != user.id:
+            failures.setdefault(index, {})["id"] = ["Forbidden"]
+
+    if failures:
+        raise BatchError(
+            "No changes were applied",
+            [{"index": index, "errors": failures[index]} for index in sorted(failures)],
+        )
+
+    return _Plan(
+        creates=[
+            (index, budgets.get(budget_id), month, values)
+            for index, budget_id, month, values in creates
+        ],
+        updates=[(index, streams[stream_id], values) for index, stream_id, values in updates],
+        deletes=[(index, streams[stream_id]) for index, stream_id in deletes],
+    )
+
+
+def apply_stream_batch(kind, user, operations):
+    """
+    Validate and apply `operations` to the user's `kind` streams. Returns one
+    result per operation, in order; raises BatchError without writing anything
+    if any operation is invalid.
+    """
+    plan = _validate(kind, user, operations)
+    results = [None] * len(operations)
+
+    with transaction.atomic():
+        months = {month for _, budget, month, _ in plan.creates if budget is None}
+        month_budgets = get_or_create_month_budgets(user, months) if months else {}
+        created = [
+            kind.model(budget=budget or month_budgets[month], **values)
+            for _, budget, month, values in plan.creates
+        ]
+        kind.model.objects.bulk_create(created)
+
+        updated_fields = set()
+        for _, stream, values in plan.updates:
+            for name, value in values.items():
+                setattr(stream, name, value)
+            updated_fields.update(values)
+        if updated_fields:
+            kind.model.objects.bulk_update(
+                [stream for _, stream, _ in plan.updates], sorted(updated_fields)
+            )
+
+        deleted = [stream for _, stream in plan.deletes]
+        if deleted:
+            with batched_stream_writes():
+                kind.model.objects.filter(id__in=[stream.id for stream in deleted]).delete()
+
+        # NOTE: Bulk writes skip (or, for the delete, opt out of) the per-stream
+        # signals, so totals and cached responses are refreshed here, once
+        touched = created + [stream for _, stream, _ in plan.updates] + deleted
+        refresh_budget_totals({stream.budget_id for stream in touched})
+        scopes = [BUDGET_SCOPE]
+        if any(getattr(stream, "transaction_id", None) for stream in touched):
+            scopes.append(TRANSACTIONS_SCOPE)
+        if any(getattr(stream, "transaction_id", None) for stream in deleted):
+            bump_transaction_list_version(user.id)
+        invalidate_user_cache(user.id, *scopes)
+
+    for (index, *_), stream in zip(plan.creates, created):
+        results[index] = {"index": index, "op": CREATE, "status": "created",
+                          "stream": kind.serializer(stream).data}
+    for index, stream, _ in plan.updates:
+        results[index] = {"index": index, "op": UPDATE, "status": "updated",
+                          "stream": kind.serializer(stream).data}
+    for index, stream in plan.deletes:
+        results[index] = {"index": index, "op": DELETE, "status": "deleted", "id": stream.id}
+    return results
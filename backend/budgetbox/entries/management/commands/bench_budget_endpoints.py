@@ -0,0 +1,107 @@
+import threading
+import time
+from unittest import mock
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+ENDPOINTS = {
+    "budget": "/api/entries/budget/",
+    "budgets": "/api/entries/budgets/",
+}
+
+
+def _environ(path, query):
+    environ = {
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "HTTP_AUTHORIZATION": "Bearer bench",
+        "HTTP_HOST": "localhost",
+        "SERVER_NAME": "localhost",
+    }
+    setup_testing_defaults(environ)
+    return environ
+
+
+def _start_response(status, headers, exc_info=None):
+    if not status.startswith("200"):
+        raise RuntimeError(f"Unexpected response: {status}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure requests/sec of the budget endpoints through the full WSGI "
+        "handler, including per-request connection handling. Run it once per "
+        "setting to compare, e.g. DB_CONN_MAX_AGE=0 vs DB_CONN_MAX_AGE=60 or "
+        "DB_POOL=true. Authentication is bypassed for --clerk-user-id; the user "
+        "and the current month's budget are created if missing, so point it at "
+        "a development database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clerk-user-id", default="bench_user")
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument(
+            "--endpoint", choices=sorted(ENDPOINTS), action="append", dest="endpoints"
+        )
+
+    def handle(self, *args, **options):
+        handler = WSGIHandler()
+        total = options["requests"]
+        concurrency = options["concurrency"]
+        database = settings.DATABASES["default"]
+        self.stdout.write(
+            f"CONN_MAX_AGE={database.get('CONN_MAX_AGE')} "
+            f"CONN_HEALTH_CHECKS={database.get('CONN_HEALTH_CHECKS')} "
+            f"pool={'pool' in database.get('OPTIONS', {})}"
+        )
+
+        with mock.patch(
+            "budgetbox_project.decorators.decode_token",
+            return_value={"sub": options["clerk_user_id"]},
+        ):
+            for name in options["endpoints"] or sorted(ENDPOINTS):
+                rate = self._run(handler, ENDPOINTS[name], total, concurrency)
+                self.stdout.write(
+                    f"{name}: {rate:.1f} req/s ({total} requests, {concurrency} threads)"
+                )
+
+    def _run(self, handler, path, total, concurrency):
+        counter = iter(range(total))
+        lock = threading.Lock()
+        errors = []
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        i = next(counter, None)
+                    if i is None:
+                        return
+                    # NOTE: A distinct query string per request keeps the response
+                    # cache out of the measurement
+                    response = handler(_environ(path, f"bench={i}"), _start_response)
+                    response.close()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        # NOTE: Warm up (creates the user/budget rows) outside the timed section
+        handler(_environ(path, "bench=warmup"), _start_response).close()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        if errors:
+            raise errors[0]
+        return total / elapsed
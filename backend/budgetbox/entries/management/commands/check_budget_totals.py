@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from entries.models import Budget, budget_totals_annotations, refresh_budget_totals
+
+
+class Command(BaseCommand):
+    help = "Recompute budget totals from their streams and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Overwrite drifted totals with the recomputed values.",
+        )
+
+    def handle(self, *args, **options):
+        drifted = (
+            Budget.objects.annotate(**budget_totals_annotations())
+            .filter(
+                ~Q(income_total=F("computed_income_total"))
+                | ~Q(expense_total=F("computed_expense_total"))
+            )
+            .order_by("id")
+        )
+
+        drifted_ids = []
+        for budget in drifted.iterator():
+            drifted_ids.append(budget.id)
+            self.stdout.write(
+                f"Budget {budget.id} ({budget.date:%Y-%m} {budget.name!r}): "
+                f"income {budget.income_total} != {budget.computed_income_total}, "
+                f"expenses {budget.expense_total} != {budget.computed_expense_total}"
+            )
+
+        if not drifted_ids:
+            self.stdout.write(self.style.SUCCESS("All budget totals are consistent."))
+            return
+
+        if options["fix"]:
+            refresh_budget_totals(drifted_ids)
+            self.stdout.write(
+                self.style.SUCCESS(f"Fixed totals for {len(drifted_ids)} budget(s).")
+            )
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{len(drifted_ids)} budget(s) have drifted totals. Re-run with --fix to repair."
+                )
+            )
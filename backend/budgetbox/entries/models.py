@@ -2,7 +2,10 @@ from decimal import Decimal
 
 from django.conf import settings
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 
 class Budget(models.Model):
@@ -12,9 +15,31 @@ class Budget(models.Model):
     name = models.CharField(max_length=100, default="My Budget", blank=True)
     date = models.DateField()
 
+    # NOTE: Materialized stream totals, kept in sync by refresh_budget_totals on every
+    # stream write (see entries/signals.py). `check_budget_totals` reports any drift.
+    income_total = models.DecimalField(
+        max_digits=20, decimal_places=2, default=Decimal("0.00")
+    )
+    expense_total = models.DecimalField(
+        max_digits=20, decimal_places=2, default=Decimal("0.00")
+    )
+
+    # NOTE: Conditional GET validators. `version` is bumped together with the totals
+    # on every stream write and on rename; see `bump_budget_version`.
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
         unique_together = ("budget_box_user", "name", "date")
         ordering = ["-date"]
+        indexes = [
+            # NOTE: Date range scans per user (cash-flow report, budget list)
+            models.Index(fields=["budget_box_user", "date"]),
+        ]
+
+    @property
+    def net_total(self):
+        return self.income_total + self.expense_total
 
     def __str__(self):
         label = self.name or "My Budget"
@@ -33,6 +58,17 @@ class ExpenseStream(models.Model):
     )
     category = models.CharField(max_length=100)
 
+    # NOTE: The synced transaction this expense was approved from. One-to-one, so a
+    # transaction can only be approved once; the unique index also backs the
+    # approved/unapproved filters of the transactions list
+    transaction = models.OneToOneField(
+        "plaid_app.Transaction",
+        related_name="expense_stream",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+
     def __str__(self):
         return f"{self.merchant_name}: ${self.amount}"
 
@@ -65,3 +101,100 @@ class IncomeStream(models.Model):
 
     def __str__(self):
         return f"{self.merchant_name}: +${self.amount}"
+
+
+def _stream_total_subquery(stream_model):
+    totals = (
+        stream_model.objects.filter(budget=OuterRef("pk"))
+        .order_by()
+        .values("budget")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    return Coalesce(
+        Subquery(totals),
+        Value(Decimal("0.00")),
+        output_field=DecimalField(max_digits=20, decimal_places=2),
+    )
+
+
+def budget_totals_annotations():
+    """Expressions recomputing a budget's totals from its streams."""
+    return {
+        "computed_income_total": _stream_total_subquery(IncomeStream),
+        "computed_expense_total": _stream_total_subquery(ExpenseStream),
+    }
+
+
+def refresh_budget_totals(budget_ids):
+    """
+    Recompute the materialized totals for the given budgets in a single UPDATE,
+    bumping their version. Runs in the caller's transaction, so a rolled back
+    stream write rolls back its totals too.
+    """
+    budget_ids = {budget_id for budget_id in budget_ids if budget_id}
+    if not budget_ids:
+        return 0
+    with transaction.atomic(savepoint=False):
+        # NOTE: Lock the budgets first, in a separate statement. A concurrent
+        # writer to the same budget waits here until this transaction commits,
+        # and its UPDATE below then takes a snapshot that includes our streams;
+        # otherwise, under READ COMMITTED, each side's subquery misses the
+        # other's uncommitted stream and the last commit wins
+        list(
+            Budget.objects.select_for_update()
+            .filter(pk__in=budget_ids)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        return Budget.objects.filter(pk__in=budget_ids).update(
+            income_total=_stream_total_subquery(IncomeStream),
+            expense_total=_stream_total_subquery(ExpenseStream),
+            version=F("version") + 1,
+            updated_at=timezone.now(),
+        )
+
+
+def get_or_create_month_budgets(user, months, name="My Budget"):
+    """
+    The user's `name` budget for each of `months` (first-of-month dates) as
+    {month: budget}: one lookup, then a get_or_create per missing month.
+    """
+    budgets = {
+        budget.date: budget
+        for budget in Budget.objects.filter(budget_box_user=user, name=name, date__in=months)
+    }
+    for month in set(months) - budgets.keys():
+        budgets[month], _ = Budget.objects.get_or_create(
+            budget_box_user=user, name=name, date=month
+        )
+    return budgets
+
+
+def bump_budget_version(budget, **changes):
+    """
+    Save `changes` to `budget` and bump its version in one UPDATE, mirroring
+    the change on the instance.
+    """
+    now = timezone.now()
+    Budget.objects.filter(pk=budget.pk).update(
+        version=F("version") + 1, updated_at=now, **changes
+    )
+    for name, value in changes.items():
+        setattr(budget, name, value)
+    budget.version += 1
+    budget.updated_at = now
+    return budget
+
+
+def bump_linked_budget_versions(transactions):
+    """
+    Bump the version of every budget holding an expense approved from
+    `transactions` (a Transaction queryset), in one UPDATE. Call it before
+    deleting them: the delete clears ExpenseStream.transaction through SET_NULL,
+    which changes those budgets' payloads without any stream signal. Returns
+    the number of budgets bumped.
+    """
+    return Budget.objects.filter(expenses__transaction__in=transactions).update(
+        version=F("version") + 1, updated_at=timezone.now()
+    )
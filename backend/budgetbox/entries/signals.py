@@ -0,0 +1,75 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from budgetbox_project.response_cache import (
+    BUDGET_LIST_SCOPE,
+    BUDGET_SCOPE,
+    TRANSACTIONS_SCOPE,
+    invalidate_user_cache,
+)
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from plaid_app.models import bump_transaction_list_version
+
+from .models import Budget, ExpenseStream, IncomeStream, refresh_budget_totals
+
+
+def _deleting_budget(origin):
+    # NOTE: When a budget is deleted its streams cascade; there are no totals left to keep
+    return isinstance(origin, Budget) or getattr(origin, "model", None) is Budget
+
+
+_batched_writes = ContextVar("batched_stream_writes", default=False)
+
+
+@contextmanager
+def batched_stream_writes():
+    """
+    Skip the per-stream totals refresh and cache invalidation inside the block.
+    The caller must refresh totals and invalidate caches itself, once for the
+    whole batch (see entries.batch).
+    """
+    token = _batched_writes.set(True)
+    try:
+        yield
+    finally:
+        _batched_writes.reset(token)
+
+
+def _stream_scopes(instance):
+    # NOTE: Approved expenses also change their transaction's `approved` status
+    if getattr(instance, "transaction_id", None):
+        return BUDGET_SCOPE, TRANSACTIONS_SCOPE
+    return (BUDGET_SCOPE,)
+
+
+@receiver(post_save, sender=IncomeStream)
+@receiver(post_save, sender=ExpenseStream)
+def stream_saved(sender, instance, **kwargs):
+    if _batched_writes.get():
+        return
+    refresh_budget_totals([instance.budget_id])
+    invalidate_user_cache(instance.budget.budget_box_user_id, *_stream_scopes(instance))
+
+
+@receiver(post_delete, sender=IncomeStream)
+@receiver(post_delete, sender=ExpenseStream)
+def stream_deleted(sender, instance, origin=None, **kwargs):
+    # NOTE: Deleting an approved expense un-approves its transaction, also when a
+    # budget delete cascades to it
+    if getattr(instance, "transaction_id", None) and not _batched_writes.get():
+        bump_transaction_list_version(instance.budget.budget_box_user_id)
+    if _deleting_budget(origin) or _batched_writes.get():
+        return
+    refresh_budget_totals([instance.budget_id])
+    invalidate_user_cache(instance.budget.budget_box_user_id, *_stream_scopes(instance))
+
+
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+def budget_changed(sender, instance, signal=None, **kwargs):
+    scopes = [BUDGET_SCOPE, BUDGET_LIST_SCOPE]
+    # NOTE: The cascade to the budget's streams un-approves their transactions
+    if signal is post_delete:
+        scopes.append(TRANSACTIONS_SCOPE)
+    invalidate_user_cache(instance.budget_box_user_id, *scopes)
@@ -1,10 +1,32 @@
-from datetime import date
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
+from budgetbox_project.renderers import ORJSONRenderer
+from budgetbox_project.response_cache import (
+    get_response_cache,
+    reset_response_cache,
+    response_cache_stats,
+)
+from clerk_app.services import get_or_create_budgetbox_user, user_cache
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.db.models import Sum
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
+from plaid_app.models import BankAccount, Transaction
+from plaid_app.rollups import rebuild_rollups
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
 
 from .models import Budget, ExpenseStream, IncomeStream
+from .serializers import (
+    ExpanseStream_serializer,
+    IncomeStream_serializer,
+    expense_stream_reader,
+    income_stream_reader,
+)
 
 
 class BudgetTotalsTest(TestCase):
@@ -52,3 +74,399 @@ class BudgetTotalsTest(TestCase):
         self.assertEqual(income_total, 2000)
         self.assertEqual(expense_total, -300)
         self.assertEqual(net_total, 1700)
+
+
+@mock.patch("budgetbox_project.decorators.decode_token", return_value={"sub": "user_test"})
+class BudgetViewTest(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        reset_response_cache()
+        self.client = APIClient(HTTP_AUTHORIZATION="Bearer token")
+        self.user = get_or_create_budgetbox_user("user_test")
+        self.budget = Budget.objects.create(
+            budget_box_user=self.user, name="My Budget", date=date(2025, 7, 1)
+        )
+        IncomeStream.objects.create(
+            budget=self.budget, merchant_name="work", amount=Decimal("2000.00")
+        )
+        for amount in ("-100.00", "-200.50"):
+            ExpenseStream.objects.create(
+                budget=self.budget,
+                merchant_name="store",
+                description="weekly",
+                amount=Decimal(amount),
+                category="expense",
+            )
+
+    def test_snapshot_uses_bounded_queries(self, _decode):
+        # NOTE: budget lookup (shared with the conditional GET check) + expenses + incomes
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/entries/budget/", {"date": "2025-07"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["streams"]), 3)
+        self.assertEqual(
+            response.data["totals"],
+            {"income": "2000.00", "expenses": "-300.50", "net": "1699.50"},
+        )
+
+    def test_budget_list_uses_bounded_queries(self, _decode):
+        # NOTE: conditional GET validators + the list itself
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/entries/budgets/")
+
+        self.assertEqual(len(response.data["budgets"]), 1)
+
+    def test_include_streams_false_omits_combined_array(self, _decode):
+        response = self.client.get(
+            "/api/entries/budget/", {"date": "2025-07", "include_streams": "false"}
+        )
+
+        self.assertNotIn("streams", response.data)
+        self.assertEqual(len(response.data["expenses"]), 2)
+        self.assertEqual(len(response.data["incomes"]), 1)
+
+    def test_fast_readers_match_drf_serializers(self, _decode):
+        expenses = self.budget.expenses.order_by("id")
+        incomes = self.budget.incomes.order_by("id")
+
+        self.assertEqual(
+            expense_stream_reader.serialize(expenses),
+            [
+                {**row, "type": "expense"}
+                for row in ExpanseStream_serializer(expenses, many=True).data
+            ],
+        )
+        self.assertEqual(
+            income_stream_reader.serialize(incomes),
+            [
+                {**row, "type": "income"}
+                for row in IncomeStream_serializer(incomes, many=True).data
+            ],
+        )
+
+    def test_conditional_get_revalidates_against_budget_version(self, _decode):
+        params = {"date": "2025-07"}
+        etag = self.client.get("/api/entries/budget/", params).headers["ETag"]
+
+        with self.assertNumQueries(1):
+            unchanged = self.client.get("/api/entries/budget/", params, HTTP_IF_NONE_MATCH=etag)
+        IncomeStream.objects.create(
+            budget=self.budget, merchant_name="bonus", amount=Decimal("50.00")
+        )
+        changed = self.client.get("/api/entries/budget/", params, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.data["totals"]["income"], "2050.00")
+        self.assertNotEqual(changed.headers["ETag"], etag)
+
+    def test_rename_changes_budget_list_validators(self, _decode):
+        etag = self.client.get("/api/entries/budgets/").headers["ETag"]
+
+        self.client.put("/api/entries/budget/", {"id": self.budget.id, "name": "July"}, format="json")
+        response = self.client.get("/api/entries/budgets/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["budgets"][0]["name"], "July")
+
+    def test_cached_snapshot_is_invalidated_by_stream_writes(self, _decode):
+        params = {"date": "2025-07"}
+        self.client.get("/api/entries/budget/", params)
+
+        # NOTE: Only the conditional GET lookup runs on a hit
+        with self.assertNumQueries(1):
+            hit = self.client.get("/api/entries/budget/", params)
+        ExpenseStream.objects.create(
+            budget=self.budget, merchant_name="gas", description="", amount=Decimal("-20.00")
+        )
+        after_write = self.client.get("/api/entries/budget/", params)
+
+        self.assertEqual(hit.headers["X-Cache"], "HIT")
+        self.assertEqual(hit.data["totals"]["expenses"], "-300.50")
+        self.assertEqual(after_write.headers["X-Cache"], "MISS")
+        self.assertEqual(after_write.data["totals"]["expenses"], "-320.50")
+
+    def test_cached_snapshot_follows_writes_from_other_processes(self, _decode):
+        params = {"date": "2025-07"}
+        self.client.get("/api/entries/budget/", params)
+
+        # NOTE: Another process's write bumps the budget version without
+        # invalidating this process's cache
+        with mock.patch("entries.signals.invalidate_user_cache"):
+            ExpenseStream.objects.create(
+                budget=self.budget, merchant_name="gas", description="", amount=Decimal("-20.00")
+            )
+        response = self.client.get("/api/entries/budget/", params)
+
+        self.assertEqual(response.headers["X-Cache"], "MISS")
+        self.assertEqual(response.data["totals"]["expenses"], "-320.50")
+
+    def test_budget_created_by_a_read_is_not_cached_under_an_empty_version(self, _decode):
+        params = {"date": "2025-09"}
+        created = self.client.get("/api/entries/budget/", params)
+        again = self.client.get("/api/entries/budget/", params)
+        cached = self.client.get("/api/entries/budget/", params)
+
+        self.assertEqual(created.status_code, 200)
+        self.assertNotIn("X-Cache", created.headers)
+        self.assertEqual((again.headers["X-Cache"], cached.headers["X-Cache"]), ("MISS", "HIT"))
+
+    def test_budget_delete_invalidates_cached_list(self, _decode):
+        self.client.get("/api/entries/budgets/")
+
+        self.client.delete("/api/entries/budget/", {"id": self.budget.id}, format="json")
+        response = self.client.get("/api/entries/budgets/")
+
+        self.assertEqual(response.data["budgets"], [])
+
+
+class ResponseCacheEvictionTest(SimpleTestCase):
+    def setUp(self):
+        reset_response_cache()
+
+    def test_least_recently_used_entry_is_evicted_one_at_a_time(self):
+        cache = get_response_cache()
+        before = response_cache_stats()["evictions"]
+        with mock.patch.object(cache, "_max_entries", 2), mock.patch.object(
+            cache, "_cull_frequency", 2
+        ):
+            cache.set("a", 1)
+            cache.set("b", 2)
+            cache.get("a")
+            cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(response_cache_stats()["evictions"] - before, 1)
+
+
+class ORJSONRendererTest(SimpleTestCase):
+    def test_output_matches_drf_json_renderer(self):
+        payload = {
+            "budget": {"id": 1, "name": "My Budget \u2028", "date": date(2025, 7, 1)},
+            "created_at": datetime(2025, 7, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+            "streams": [{"amount": "-45.10", "category": None, "type": "expense"}],
+            3: True,
+        }
+
+        fast = ORJSONRenderer().render(payload)
+
+        self.assertEqual(json.loads(fast), json.loads(JSONRenderer().render(payload)))
+        self.assertIn(b"\\u2028", fast)
+        self.assertIn(b'"2025-07-01T12:30:15.123456Z"', fast)
+
+    def test_raw_decimals_render_as_strings(self):
+        self.assertEqual(
+            ORJSONRenderer().render({"amount": Decimal("12.50")}), b'{"amount":"12.50"}'
+        )
+
+
+class BudgetMaterializedTotalsTest(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create(email="totals@example.com", budget_id="b1")
+        self.budget = Budget.objects.create(
+            budget_box_user=user, name="My Budget", date=date(2025, 7, 1)
+        )
+
+    def test_stream_writes_keep_totals_in_sync(self):
+        income = IncomeStream.objects.create(
+            budget=self.budget, merchant_name="work", amount=Decimal("1000.00")
+        )
+        expense = ExpenseStream.objects.create(
+            budget=self.budget, merchant_name="rent", amount=Decimal("-400.00")
+        )
+        income.amount = Decimal("1500.00")
+        income.save()
+        expense.delete()
+
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.income_total, Decimal("1500.00"))
+        self.assertEqual(self.budget.expense_total, Decimal("0.00"))
+        self.assertEqual(self.budget.net_total, Decimal("1500.00"))
+
+    def test_check_budget_totals_reports_and_fixes_drift(self):
+        IncomeStream.objects.create(
+            budget=self.budget, merchant_name="work", amount=Decimal("1000.00")
+        )
+        Budget.objects.filter(pk=self.budget.pk).update(income_total=Decimal("1.00"))
+
+        out = StringIO()
+        call_command("check_budget_totals", "--fix", stdout=out)
+
+        self.assertIn(f"Budget {self.budget.id}", out.getvalue())
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.income_total, Decimal("1000.00"))
+
+
+@mock.patch("budgetbox_project.decorators.decode_token", return_value={"sub": "user_flow"})
+class CashFlowViewTest(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.client = APIClient(HTTP_AUTHORIZATION="Bearer token")
+        self.user = get_or_create_budgetbox_user("user_flow")
+        for month, salary, rent in ((1, "1000.00", "-400.00"), (2, "1200.00", "-400.00"), (3, "1100.00", "-500.00")):
+            budget = Budget.objects.create(budget_box_user=self.user, date=date(2025, month, 1))
+            IncomeStream.objects.create(budget=budget, merchant_name="work", amount=Decimal(salary))
+            ExpenseStream.objects.create(
+                budget=budget, merchant_name="landlord", description="", amount=Decimal(rent), category="rent"
+            )
+            ExpenseStream.objects.create(
+                budget=budget, merchant_name="cafe", description="", amount=Decimal("-20.00"), category="food"
+            )
+        bank_account = BankAccount.objects.create(
+            user=self.user, plaid_account_id="acc-flow", plaid_access_token="access-flow",
+            plaid_item_id="item-flow", account_name="Checking", account_type="depository",
+            account_subtype="checking",
+        )
+        for i, (day, category) in enumerate(
+            ((date(2025, 2, 3), "FOOD_AND_DRINK"), (date(2025, 2, 28), "TRAVEL"), (date(2025, 3, 1), "FOOD_AND_DRINK"))
+        ):
+            Transaction.objects.create(
+                user=self.user, bank_account=bank_account, amount=Decimal("12.50"),
+                merchant_name="Cafe", authorized_date=day, category=category,
+                plaid_transaction_id=f"flow-{i}",
+            )
+        # NOTE: Transactions created directly bypass the incremental rollup updates
+        rebuild_rollups([self.user.id])
+
+    def test_months_are_grouped_in_one_query(self, _decode):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/entries/cash-flow/", {"start": "2025-02", "end": "2025-04"})
+
+        self.assertEqual(response.status_code, 200)
+        feb, mar, apr = response.data["months"]
+        self.assertEqual(
+            (feb["month"], feb["income"], feb["expenses"], feb["net"], feb["transactions"]),
+            ("2025-02", "1200.00", "-420.00", "780.00", "25.00"),
+        )
+        self.assertEqual(feb["by_category"]["expenses"], {"food": "-20.00", "rent": "-400.00"})
+        self.assertEqual(feb["by_category"]["transactions"], {"FOOD_AND_DRINK": "12.50", "TRAVEL": "12.50"})
+        self.assertEqual(mar["transactions"], "12.50")
+        self.assertEqual((apr["income"], apr["by_category"]["income"]), ("0.00", {}))
+        self.assertEqual(response.data["totals"]["net"], "1360.00")
+
+    def test_category_filter_and_rolling_window(self, _decode):
+        response = self.client.get(
+            "/api/entries/cash-flow/",
+            {"start": "2025-02", "end": "2025-03", "category": "food,food_and_drink", "window": "2"},
+        )
+
+        feb, mar = response.data["months"]
+        self.assertEqual((feb["income"], feb["expenses"], feb["transactions"]), ("0.00", "-20.00", "12.50"))
+        # NOTE: February's window reaches back into January, outside the range
+        self.assertEqual(feb["rolling"]["expenses"], "-40.00")
+        self.assertEqual(mar["rolling"]["transactions"], "25.00")
+
+    def test_invalid_ranges_are_rejected(self, _decode):
+        for params in ({"start": "2025-13"}, {"start": "2025-04", "end": "2025-01"}, {"window": "0"}):
+            response = self.client.get("/api/entries/cash-flow/", params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+@mock.patch("budgetbox_project.decorators.decode_token", return_value={"sub": "user_batch"})
+class StreamBatchViewTest(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        reset_response_cache()
+        self.client = APIClient(HTTP_AUTHORIZATION="Bearer token")
+        self.user = get_or_create_budgetbox_user("user_batch")
+        self.budget = Budget.objects.create(budget_box_user=self.user, date=date(2025, 1, 1))
+        self.rent = ExpenseStream.objects.create(
+            budget=self.budget, merchant_name="landlord", description="", amount=Decimal("-400.00"), category="rent"
+        )
+        self.cafe = ExpenseStream.objects.create(
+            budget=self.budget, merchant_name="cafe", description="", amount=Decimal("-20.00"), category="food"
+        )
+
+    def post(self, kind, operations):
+        return self.client.post(f"/api/entries/{kind}/batch/", {"operations": operations}, format="json")
+
+    def test_mixed_batch_is_applied_in_bulk(self, _decode):
+        operations = [
+            {"op": "create", "budget_id": self.budget.id, "merchant_name": f"shop {i}", "amount": "10.00"}
+            for i in range(20)
+        ] + [
+            {"op": "update", "id": self.rent.id, "amount": "450.00", "description": "raised"},
+            {"op": "delete", "id": self.cafe.id},
+            {"op": "create", "date": "2025-02", "merchant_name": "gym", "amount": "-30"},
+        ]
+        # NOTE: Independent of the batch size: the budget and stream lookups, the
+        # February budget's get_or_create, one INSERT, UPDATE and DELETE (plus the
+        # delete's collection SELECT), the totals refresh (lock + UPDATE) and the
+        # savepoints
+        with self.assertNumQueries(15):
+            response = self.post("expense-stream", operations)
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual([r["status"] for r in results[-3:]], ["updated", "deleted", "created"])
+        self.assertEqual(results[-2]["id"], self.cafe.id)
+        self.assertEqual(results[0]["stream"]["amount"], "-10.00")
+        self.assertEqual(results[0]["stream"]["category"], "expense")
+        self.assertFalse(ExpenseStream.objects.filter(id=self.cafe.id).exists())
+
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.expense_total, Decimal("-650.00"))
+        february = Budget.objects.get(budget_box_user=self.user, date=date(2025, 2, 1))
+        self.assertEqual(february.expense_total, Decimal("-30.00"))
+
+    def test_invalid_operation_applies_nothing(self, _decode):
+        response = self.post(
+            "income-stream",
+            [
+                {"op": "create", "budget_id": self.budget.id, "merchant_name": "work", "amount": "1000"},
+                {"op": "create", "budget_id": self.budget.id, "merchant_name": "x" * 101, "amount": "0"},
+                {"op": "update", "id": self.rent.id, "amount": "1"},
+                {"op": "rename"},
+            ],
+        )
+
+        self.assertEqual(response.status_code, 400)
+        errors = {error["index"]: error["errors"] for error in response.data["errors"]}
+        self.assertEqual(sorted(errors), [1, 2, 3])
+        self.assertEqual(sorted(errors[1]), ["amount", "merchant_name"])
+        # NOTE: Stream ids are per kind; the rent expense is no income stream
+        self.assertEqual(errors[2], {"id": ["Stream not found"]})
+        self.assertFalse(IncomeStream.objects.exists())
+
+    def test_queryset_deletes_outside_batches_still_refresh_totals(self, _decode):
+        ExpenseStream.objects.filter(id=self.cafe.id).delete()
+
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.expense_total, Decimal("-400.00"))
+
+    def test_null_values_and_malformed_payloads_are_rejected(self, _decode):
+        response = self.post(
+            "expense-stream",
+            [
+                {"op": "update", "id": self.rent.id, "amount": None},
+                {"op": "update", "id": self.cafe.id, "merchant_name": None, "description": ""},
+            ],
+        )
+        listed = self.client.post("/api/entries/expense-stream/batch/", [{"op": "delete"}], format="json")
+
+        self.assertEqual(response.status_code, 400)
+        errors = {error["index"]: error["errors"] for error in response.data["errors"]}
+        self.assertEqual(list(errors[0]), ["amount"])
+        self.assertEqual(sorted(errors[1]), ["description", "merchant_name"])
+        self.assertEqual(listed.status_code, 400)
+        self.rent.refresh_from_db()
+        self.assertEqual(self.rent.amount, Decimal("-400.00"))
+
+    def test_other_users_streams_are_forbidden(self, _decode):
+        other = get_or_create_budgetbox_user("user_batch_other")
+        budget = Budget.objects.create(budget_box_user=other, date=date(2025, 1, 1))
+        stream = IncomeStream.objects.create(budget=budget, merchant_name="work", amount=Decimal("100.00"))
+
+        response = self.post(
+            "income-stream",
+            [{"op": "delete", "id": stream.id}, {"op": "create", "budget_id": budget.id, "amount": "5"}],
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data["errors"],
+            [{"index": 0, "errors": {"id": ["Forbidden"]}}, {"index": 1, "errors": {"budget_id": ["Budget not found"]}}],
+        )
+        self.assertTrue(IncomeStream.objects.filter(id=stream.id).exists())
@@ -1,10 +1,21 @@
 from django.urls import path
 
-from .views import BudgetView, ExpenseStreamView, IncomeStreamView, BudgetListView
+from .views import (
+    BudgetListView,
+    BudgetView,
+    CashFlowView,
+    ExpenseStreamBatchView,
+    ExpenseStreamView,
+    IncomeStreamBatchView,
+    IncomeStreamView,
+)
 
 urlpatterns = [
     path("budget/", BudgetView.as_view(), name="budget"),
     path("budgets/", BudgetListView.as_view(), name="budget-list"),
+    path("cash-flow/", CashFlowView.as_view(), name="cash-flow"),
     path("income-stream/", IncomeStreamView.as_view(), name="incomestream"),
     path("expense-stream/", ExpenseStreamView.as_view(), name="expensestream"),
+    path("income-stream/batch/", IncomeStreamBatchView.as_view(), name="incomestream-batch"),
+    path("expense-stream/batch/", ExpenseStreamBatchView.as_view(), name="expensestream-batch"),
 ]
@@ -1,23 +1,38 @@
 from datetime import date, datetime
 from decimal import Decimal
 
-from budgetbox_project.decorators import clerk_auth_required
+from budgetbox_project.decorators import clerk_auth_required, conditional_get
+from budgetbox_project.response_cache import (
+    BUDGET_LIST_SCOPE,
+    BUDGET_SCOPE,
+    cached_response,
+    invalidate_user_cache,
+)
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Max
 from django.utils.timezone import now
 from rest_framework import status as s
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Budget, ExpenseStream, IncomeStream
+from .analytics import add_months, cash_flow_report
+from .batch import EXPENSE_STREAMS, INCOME_STREAMS, BatchError, apply_stream_batch
+from .models import Budget, ExpenseStream, IncomeStream, bump_budget_version
 from .serializers import (
     Budget_serializer,
     ExpanseStream_serializer,
     IncomeStream_serializer,
+    expense_stream_reader,
+    income_stream_reader,
 )
-from django.db.models import Sum
 
 User = get_user_model()
 
+# NOTE: Bounds on the cash-flow report, which builds one entry per month in range
+MAX_CASH_FLOW_MONTHS = 120
+MAX_ROLLING_WINDOW = 24
+
 
 def _first_of_month(d: date) -> date:
     return d.replace(day=1)
@@ -42,15 +57,14 @@ def _parse_date_or_current_month(raw):
     return _first_of_month(now().date())
 
 
-def _get_or_create_user(clerk_user_id: str) -> User:
-    user, _ = User.objects.get_or_create(
-        clerk_user_id=clerk_user_id,
-        defaults={
-            "email": f"user_{clerk_user_id}@example.com",
-            "budget_id": clerk_user_id,
-        },
-    )
-    return user
+def _parse_month(raw):
+    """Strict variant of _parse_date_or_current_month: None if `raw` isn't a date."""
+    for fmt in ("%Y-%m-%d", "%Y-%m"):
+        try:
+            return _first_of_month(datetime.strptime(str(raw), fmt).date())
+        except ValueError:
+            continue
+    return None
 
 
 def _get_or_create_budget(user: User, month_date: date, name: str = "My Budget") -> Budget:
@@ -59,50 +73,86 @@ def _get_or_create_budget(user: User, month_date: date, name: str = "My Budget")
     )[0]
 
 
+def _query_flag(raw, default: bool) -> bool:
+    if raw is None:
+        return default
+    return str(raw).lower() not in ("0", "false", "no", "off")
+
+
+def _budget_validators(request):
+    # NOTE: Loads the requested budget once; BudgetView.get reuses it when the
+    # client copy is stale instead of looking it up again
+    budget = Budget.objects.filter(
+        budget_box_user=request.budgetbox_user,
+        date=_parse_date_or_current_month(request.query_params.get("date")),
+        name=request.query_params.get("name") or "My Budget",
+    ).first()
+    request.conditional_budget = budget
+    if budget is None:
+        return None, None
+    return f"budget:{budget.id}:{budget.version}", budget.updated_at
+
+
+def _budget_list_validators(request):
+    user = request.budgetbox_user
+    stats = Budget.objects.filter(budget_box_user=user).aggregate(
+        count=Count("id"), updated=Max("updated_at")
+    )
+    if not stats["count"]:
+        return None, None
+    version = f"budgets:{user.id}:{stats['count']}:{stats['updated'].timestamp()}"
+    return version, stats["updated"]
+
+
+def _load_budget_snapshot(budget: Budget) -> dict:
+    """
+    Loads both stream sets for a budget (one values() query each, tagged with
+    their 'type' for the frontend). Totals come from the budget row itself,
+    which is kept up to date on every stream write.
+    """
+    expense_data = expense_stream_reader.serialize(budget.expenses.order_by("id"))
+    income_data = income_stream_reader.serialize(budget.incomes.order_by("id"))
+
+    return {
+        "expenses": expense_data,
+        "incomes": income_data,
+        "totals": {
+            "income": str(budget.income_total),
+            "expenses": str(budget.expense_total),
+            "net": str(budget.net_total),
+        },
+    }
+
+
 class BudgetView(APIView):
     @clerk_auth_required
+    @conditional_get(_budget_validators)
+    @cached_response(BUDGET_SCOPE)
     def get(self, request):
-        clerk_user_id = request.clerk_user_id
-        user = _get_or_create_user(clerk_user_id)
+        """
+        Returns the budget for `date`/`name` with its streams and totals.
+        Pass `include_streams=false` to omit the combined `streams` array, which
+        repeats the contents of `expenses` and `incomes`. Supports If-None-Match
+        and If-Modified-Since against the budget's version.
+        """
+        user = request.budgetbox_user
 
         month_param = request.query_params.get("date")
         name_param = request.query_params.get("name")
         month_date = _parse_date_or_current_month(month_param)
+        include_streams = _query_flag(request.query_params.get("include_streams"), True)
 
-        budget = _get_or_create_budget(user, month_date, name_param or "My Budget")
-
-        expense_streams = budget.expenses.all().order_by("id")
-        income_streams = budget.incomes.all().order_by("id")
-
-        expense_data = ExpanseStream_serializer(expense_streams, many=True).data
-        income_data = IncomeStream_serializer(income_streams, many=True).data
-
-        # NOTE: Add 'type' field to distinguish between income and expenses on frontend
-        for stream in expense_data:
-            stream["type"] = "expense"
-        for stream in income_data:
-            stream["type"] = "income"
-
-        all_streams = list(expense_data) + list(income_data)
+        budget = request.conditional_budget or _get_or_create_budget(
+            user, month_date, name_param or "My Budget"
+        )
+        snapshot = _load_budget_snapshot(budget)
 
-        income_total = income_streams.aggregate(total=Sum("amount")).get("total") or Decimal("0")
-        expense_total = expense_streams.aggregate(total=Sum("amount")).get("total") or Decimal("0")
-        net_total = (income_total or Decimal("0")) + (expense_total or Decimal("0"))
+        data = {"budget": Budget_serializer(budget).data}
+        if include_streams:
+            data["streams"] = list(snapshot["expenses"]) + list(snapshot["incomes"])
+        data.update(snapshot)
 
-        return Response(
-            {
-                "budget": Budget_serializer(budget).data,
-                "streams": all_streams,
-                "expenses": expense_data,
-                "incomes": income_data,
-                "totals": {
-                    "income": str(income_total or Decimal("0")),
-                    "expenses": str(expense_total or Decimal("0")),
-                    "net": str(net_total),
-                },
-            },
-            status=s.HTTP_200_OK,
-        )
+        return Response(data, status=s.HTTP_200_OK)
 
     @clerk_auth_required
     def put(self, request):
@@ -110,8 +160,7 @@ class BudgetView(APIView):
         Update a budget's name. Identify budget by `id` or `date` (YYYY-MM or YYYY-MM-DD).
         Payload: { id?: number, date?: string, name: string }
         """
-        clerk_user_id = request.clerk_user_id
-        user = _get_or_create_user(clerk_user_id)
+        user = request.budgetbox_user
 
         budget_id = request.data.get("id")
         month_param = request.data.get("date")
@@ -131,8 +180,8 @@ class BudgetView(APIView):
             month_date = _parse_date_or_current_month(month_param)
             budget = _get_or_create_budget(user, month_date, new_name)
 
-        budget.name = new_name
-        budget.save(update_fields=["name"])
+        bump_budget_version(budget, name=new_name)
+        invalidate_user_cache(user.id, BUDGET_SCOPE, BUDGET_LIST_SCOPE)
 
         return Response(Budget_serializer(budget).data, status=s.HTTP_200_OK)
 
@@ -142,8 +191,7 @@ class BudgetView(APIView):
         Delete a budget and all its associated income/expense streams.
         Payload: { id: number }
         """
-        clerk_user_id = request.clerk_user_id
-        user = _get_or_create_user(clerk_user_id)
+        user = request.budgetbox_user
 
         budget_id = request.data.get("id")
         if not budget_id:
@@ -176,9 +224,10 @@ class BudgetView(APIView):
 
 class BudgetListView(APIView):
     @clerk_auth_required
+    @conditional_get(_budget_list_validators)
+    @cached_response(BUDGET_LIST_SCOPE)
     def get(self, request):
-        clerk_user_id = request.clerk_user_id
-        user = _get_or_create_user(clerk_user_id)
+        user = request.budgetbox_user
 
         budgets = Budget.objects.filter(budget_box_user=user).order_by("-date")
         data = [
@@ -193,11 +242,60 @@ class BudgetListView(APIView):
         return Response({"budgets": data}, status=s.HTTP_200_OK)
 
 
+class CashFlowView(APIView):
+    @clerk_auth_required
+    def get(self, request):
+        """
+        Monthly cash flow across budgets and synced transactions.
+        Query params:
+          - start / end: 'YYYY-MM' or 'YYYY-MM-DD' (default: the 12 months up to this one)
+          - category: repeatable or comma separated; filters streams and transactions
+          - window: months in the trailing `rolling` sums (optional)
+        """
+        params = request.query_params
+        end = _parse_month(params["end"]) if params.get("end") else _first_of_month(now().date())
+        start = _parse_month(params["start"]) if params.get("start") else add_months(end or now().date(), -11)
+        if start is None or end is None:
+            return Response(
+                {"detail": "start and end must be YYYY-MM or YYYY-MM-DD"},
+                status=s.HTTP_400_BAD_REQUEST,
+            )
+        months = (end.year - start.year) * 12 + end.month - start.month + 1
+        if not 1 <= months <= MAX_CASH_FLOW_MONTHS:
+            return Response(
+                {"detail": f"start must be before end and at most {MAX_CASH_FLOW_MONTHS} months apart"},
+                status=s.HTTP_400_BAD_REQUEST,
+            )
+
+        window = params.get("window")
+        if window:
+            try:
+                window = int(window)
+            except ValueError:
+                window = 0
+            if not 1 <= window <= MAX_ROLLING_WINDOW:
+                return Response(
+                    {"detail": f"window must be between 1 and {MAX_ROLLING_WINDOW}"},
+                    status=s.HTTP_400_BAD_REQUEST,
+                )
+
+        categories = {
+            category.strip()
+            for raw in params.getlist("category")
+            for category in raw.split(",")
+            if category.strip()
+        }
+
+        report = cash_flow_report(
+            request.budgetbox_user, start, end, categories=categories, window=window or None
+        )
+        return Response(report, status=s.HTTP_200_OK)
+
+
 class IncomeStreamView(APIView):
     @clerk_auth_required
     def post(self, request):
-        clerk_user_id = request.clerk_user_id
-        user = _get_or_create_user(clerk_user_id)
+        user = request.budgetbox_user
 
         budget_id = request.data.get("budget_id")
         if budget_id:
@@ -221,13 +319,14 @@ class IncomeStreamView(APIView):
         if amount < 0:
             amount = -amount
 
-        stream = IncomeStream.objects.create(
-            budget=budget,
-            merchant_name=merchant_name,
-            description=description,
-            amount=amount,
-            category=request.data.get("category", "salary"),
-        )
+        with transaction.atomic():
+            stream = IncomeStream.objects.create(
+                budget=budget,
+                merchant_name=merchant_name,
+                description=description,
+                amount=amount,
+                category=request.data.get("category", "salary"),
+            )
         return Response(IncomeStream_serializer(stream).data, status=s.HTTP_201_CREATED)
 
     @clerk_auth_required
@@ -236,8 +335,7 @@ class IncomeStreamView(APIView):
         Payload must include: id
         Optional fields to update: merchant_name, description, amount, category, recurrence
         """
-        clerk_user_id = request.clerk_user_id
-        user = _get_or_create_user(clerk_user_id)
+        user = request.budgetbox_user
 
         stream_id = request.data.get("id")
         if not stream_id:
@@ -271,14 +369,14 @@ class IncomeStreamView(APIView):
                 else:
                     setattr(stream, field, request.data[field])
 
-        stream.save(update_fields=updatable)
+        with transaction.atomic():
+            stream.save(update_fields=updatable)
         return Response(IncomeStream_serializer(stream).data, status=s.HTTP_200_OK)
 
     @clerk_auth_required
     def delete(self, request):
         """Delete an income stream"""
-        clerk_user_id = request.clerk_user_id
-        user = _get_or_create_user(clerk_user_id)
+        user = request.budgetbox_user
 
         stream_id = request.data.get("id")
 
@@ -305,7 +403,8 @@ class IncomeStreamView(APIView):
             "category": stream.category,
         }
 
-        stream.delete()
+        with transaction.atomic():
+            stream.delete()
 
         return Response(
             {
@@ -319,8 +418,7 @@ class IncomeStreamView(APIView):
 class ExpenseStreamView(APIView):
     @clerk_auth_required
     def post(self, request):
-        clerk_user_id = request.clerk_user_id
-        user = _get_or_create_user(clerk_user_id)
+        user = request.budgetbox_user
 
         budget_id = request.data.get("budget_id")
         if budget_id:
@@ -344,13 +442,14 @@ class ExpenseStreamView(APIView):
         if amount > 0:
             amount = -amount
 
-        stream = ExpenseStream.objects.create(
-            budget=budget,
-            merchant_name=merchant_name,
-            description=description,
-            amount=amount,
-            category="expense",
-        )
+        with transaction.atomic():
+            stream = ExpenseStream.objects.create(
+                budget=budget,
+                merchant_name=merchant_name,
+                description=description,
+                amount=amount,
+                category="expense",
+            )
         return Response(
             ExpanseStream_serializer(stream).data, status=s.HTTP_201_CREATED
         )
@@ -361,8 +460,7 @@ class ExpenseStreamView(APIView):
         Payload must include: id
         Optional fields to update: merchant_name, description, amount, category, recurrence
         """
-        clerk_user_id = request.clerk_user_id
-        user = _get_or_create_user(clerk_user_id)
+        user = request.budgetbox_user
 
         stream_id = request.data.get("id")
         if not stream_id:
@@ -396,14 +494,14 @@ class ExpenseStreamView(APIView):
                 else:
                     setattr(stream, field, request.data[field])
 
-        stream.save(update_fields=updatable)
+        with transaction.atomic():
+            stream.save(update_fields=updatable)
         return Response(ExpanseStream_serializer(stream).data, status=s.HTTP_200_OK)
 
     @clerk_auth_required
     def delete(self, request):
         """Delete an expense stream"""
-        clerk_user_id = request.clerk_user_id
-        user = _get_or_create_user(clerk_user_id)
+        user = request.budgetbox_user
 
         stream_id = request.data.get("id")
 
@@ -430,7 +528,8 @@ class ExpenseStreamView(APIView):
             "category": stream.category,
         }
 
-        stream.delete()
+        with transaction.atomic():
+            stream.delete()
 
         return Response(
             {
@@ -439,3 +538,35 @@ class ExpenseStreamView(APIView):
             },
             status=s.HTTP_200_OK,
         )
+
+
+class _StreamBatchView(APIView):
+    kind = None
+
+    @clerk_auth_required
+    def post(self, request):
+        """
+        Payload: {"operations": [...]}, each one of
+          - {"op": "create", "budget_id" or "date", "merchant_name", "description", "amount", "category"}
+          - {"op": "update", "id", any of merchant_name, description, amount, category}
+          - {"op": "delete", "id"}
+        All operations are validated first and applied together, or not at all.
+        """
+        # NOTE: A JSON array body has no "operations"; _validate rejects the None
+        operations = request.data.get("operations") if isinstance(request.data, dict) else None
+        try:
+            results = apply_stream_batch(self.kind, request.budgetbox_user, operations)
+        except BatchError as e:
+            body = {"detail": e.detail}
+            if e.errors:
+                body["errors"] = e.errors
+            return Response(body, status=s.HTTP_400_BAD_REQUEST)
+        return Response({"results": results}, status=s.HTTP_200_OK)
+
+
+class IncomeStreamBatchView(_StreamBatchView):
+    kind = INCOME_STREAMS
+
+
+class ExpenseStreamBatchView(_StreamBatchView):
+    kind = EXPENSE_STREAMS
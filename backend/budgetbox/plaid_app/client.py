@@ -0,0 +1,190 @@
+import bisect
+import random
+import threading
+import time
+from collections import defaultdict
+
+import plaid
+from budgetbox_project.settings import (
+    PLAID_CLIENT_ID,
+    PLAID_CONNECT_TIMEOUT,
+    PLAID_ENV,
+    PLAID_MAX_RETRIES,
+    PLAID_POOL_SIZE,
+    PLAID_READ_TIMEOUT,
+    PLAID_RETRY_BACKOFF,
+    PLAID_RETRY_BACKOFF_MAX,
+    PLAID_SECRET,
+)
+from plaid.api import plaid_api
+from urllib3.exceptions import HTTPError
+
+PLAID_ENVIRONMENTS = {
+    "sandbox": plaid.Environment.Sandbox,
+    "production": plaid.Environment.Production,
+}
+
+# NOTE: Upper bounds in milliseconds; the last bucket catches everything slower
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+# NOTE: Calls that must not be repeated once Plaid may have processed them. They are
+# still retried on 429, which Plaid returns before doing any work.
+NON_IDEMPOTENT_OPERATIONS = {"item_public_token_exchange"}
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(self.buckets, self.counts)
+            },
+        }
+
+
+class PlaidClientMetrics:
+    """Per-operation latency histograms plus error and retry counts, thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = defaultdict(LatencyHistogram)
+        self.errors = defaultdict(int)
+        self.retries = defaultdict(int)
+
+    def observe(self, operation, seconds, error=False):
+        with self._lock:
+            self.latency[operation].observe(seconds * 1000)
+            if error:
+                self.errors[operation] += 1
+
+    def retried(self, operation):
+        with self._lock:
+            self.retries[operation] += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                operation: {
+                    **histogram.as_dict(),
+                    "errors": self.errors[operation],
+                    "retries": self.retries[operation],
+                }
+                for operation, histogram in sorted(self.latency.items())
+            }
+
+
+def _is_retryable(operation, error):
+    if isinstance(error, plaid.ApiException):
+        if error.status == 429:
+            return True
+        return error.status is not None and error.status >= 500 and (
+            operation not in NON_IDEMPOTENT_OPERATIONS
+        )
+    # NOTE: Timeouts and dropped connections; the request may have reached Plaid
+    return isinstance(error, HTTPError) and operation not in NON_IDEMPOTENT_OPERATIONS
+
+
+class PlaidClient:
+    """
+    Wraps `plaid_api.PlaidApi` so every operation (`client.transactions_sync(...)`
+    etc.) gets the configured request timeout, jittered exponential backoff on
+    rate limits, 5xx responses and connection errors, and a latency sample in
+    `metrics`.
+    """
+
+    def __init__(
+        self,
+        api,
+        timeout=(PLAID_CONNECT_TIMEOUT, PLAID_READ_TIMEOUT),
+        max_retries=PLAID_MAX_RETRIES,
+        backoff=PLAID_RETRY_BACKOFF,
+        backoff_max=PLAID_RETRY_BACKOFF_MAX,
+        sleep=time.sleep,
+    ):
+        self.api = api
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+        self.metrics = PlaidClientMetrics()
+
+    def backoff_delay(self, attempt):
+        # NOTE: "Full jitter": uniform over [0, capped exponential] spreads out
+        # retries from concurrent workers hitting the same rate limit
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+
+    def call(self, operation, *args, **kwargs):
+        method = getattr(self.api, operation)
+        kwargs.setdefault("_request_timeout", self.timeout)
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = method(*args, **kwargs)
+            except Exception as e:
+                self.metrics.observe(operation, time.perf_counter() - start, error=True)
+                if attempt >= self.max_retries or not _is_retryable(operation, e):
+                    raise
+                self.metrics.retried(operation)
+                self.sleep(self.backoff_delay(attempt))
+                attempt += 1
+                continue
+            self.metrics.observe(operation, time.perf_counter() - start)
+            return response
+
+    def __getattr__(self, operation):
+        if operation.startswith("_"):
+            raise AttributeError(operation)
+
+        def call(*args, **kwargs):
+            return self.call(operation, *args, **kwargs)
+
+        return call
+
+
+def create_plaid_client(
+    environment=PLAID_ENV,
+    client_id=PLAID_CLIENT_ID,
+    secret=PLAID_SECRET,
+    pool_size=PLAID_POOL_SIZE,
+    **options,
+):
+    """
+    Build a PlaidClient from settings. `pool_size` caps the HTTP connections kept
+    per host and should cover PLAID_SYNC_MAX_WORKERS so parallel syncs don't queue
+    for a connection. Extra `options` are passed to PlaidClient.
+    """
+    # NOTE: A URL selects a custom host, e.g. the local fake in plaid_app/fake_plaid.py
+    if environment.startswith(("http://", "https://")):
+        host = environment
+    elif environment in PLAID_ENVIRONMENTS:
+        host = PLAID_ENVIRONMENTS[environment]
+    else:
+        raise ValueError(f"Unknown Plaid environment '{environment}'")
+    configuration = plaid.Configuration(
+        host=host,
+        api_key={
+            "clientId": client_id,
+            "secret": secret,
+        },
+    )
+    configuration.connection_pool_maxsize = pool_size
+    api_client = plaid.ApiClient(configuration)
+    return PlaidClient(plaid_api.PlaidApi(api_client), **options)
+
+
+plaid_client = create_plaid_client()
@@ -0,0 +1,362 @@
+"""
+Local stand-in for the Plaid endpoints BudgetBox calls, for offline load tests.
+
+Point the client at it with PLAID_ENV=http://127.0.0.1:<port> (see
+`manage.py fake_plaid_server`) or start it in-process with FakePlaidServer.
+Every exchanged item gets a deterministic synthetic history; `transactions_sync`
+pages through it with cursors and `has_more`, and `transactions_refresh`
+appends another round of added/modified/removed transactions.
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .models import TransactionCategory
+
+MERCHANTS = ["Corner Cafe", "City Grocer", "Metro Transit", "Gas & Go", "Streamly", "Book Nook"]
+CATEGORIES = [c for c in TransactionCategory.values if c != TransactionCategory.UNCATEGORIZED]
+
+
+@dataclass
+class FakePlaidConfig:
+    """
+    - `accounts_per_item`: BankAccount keeps item ids and access tokens unique,
+      so linking through the app only supports one account per item.
+    - `history_size`: transactions per account in the initial history.
+    - `rounds`: update rounds already pending at exchange time (more are added by
+      each `transactions_refresh`), `round_size` events per account each.
+    - `mix`: relative (added, modified, removed) weights of update round events.
+    - `latency_ms`/`latency_jitter_ms`: delay added to every response.
+    - `error_rate`/`error_statuses`/`error_operations`: probability of failing a
+      call (only the listed operations, or all when empty) with one of the statuses.
+    """
+
+    accounts_per_item: int = 1
+    history_size: int = 500
+    rounds: int = 1
+    round_size: int = 50
+    mix: tuple = (0.5, 0.3, 0.2)
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_statuses: tuple = (429, 500)
+    error_operations: tuple = ()
+    seed: int = 0
+
+
+@dataclass
+class FakeItem:
+    item_id: str
+    access_token: str
+    accounts: list
+    rng: random.Random
+    # NOTE: Append-only log of ("added" | "modified" | "removed", transaction);
+    # a cursor is an offset into it
+    events: list = field(default_factory=list)
+    live: dict = field(default_factory=dict)
+    next_id: int = 0
+
+
+class PlaidError(Exception):
+    def __init__(self, status, error_type, error_code, message):
+        super().__init__(message)
+        self.status = status
+        self.body = {
+            "error_type": error_type,
+            "error_code": error_code,
+            "error_message": message,
+            "display_message": None,
+        }
+
+
+_ERRORS_BY_STATUS = {
+    429: ("RATE_LIMIT_EXCEEDED", "TRANSACTIONS_SYNC_LIMIT"),
+    500: ("API_ERROR", "INTERNAL_SERVER_ERROR"),
+    502: ("API_ERROR", "PLANNED_MAINTENANCE"),
+    503: ("INSTITUTION_ERROR", "INSTITUTION_NOT_RESPONDING"),
+}
+
+
+class FakePlaidBackend:
+    """The fake's state and operations, independent of HTTP."""
+
+    def __init__(self, config=None):
+        self.config = config or FakePlaidConfig()
+        self.rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self.items = {}
+        self.used_public_tokens = set()
+        self.calls = {}
+        self.items_created = 0
+
+    # Synthetic data
+
+    def _account(self, item, index):
+        return {
+            "account_id": f"{item.item_id}-acc-{index}",
+            "balances": {
+                "available": 1000.0,
+                "current": 1100.0,
+                "limit": None,
+                "iso_currency_code": "USD",
+                "unofficial_currency_code": None,
+            },
+            "mask": f"{index:04d}",
+            "name": f"Fake Checking {index}",
+            "official_name": f"Fake Bank Checking {index}",
+            "type": "depository",
+            "subtype": "checking",
+        }
+
+    def _transaction(self, item, account_id, transaction_id=None):
+        rng = item.rng
+        if transaction_id is None:
+            transaction_id = f"{item.item_id}-txn-{item.next_id}"
+            item.next_id += 1
+        day = date(2025, 1, 1) + timedelta(days=rng.randrange(365))
+        merchant = rng.choice(MERCHANTS)
+        category = rng.choice(CATEGORIES)
+        return {
+            "account_id": account_id,
+            "amount": round(rng.uniform(1, 250), 2),
+            "iso_currency_code": "USD",
+            "unofficial_currency_code": None,
+            "date": day.isoformat(),
+            "location": dict.fromkeys(
+                ["address", "city", "region", "postal_code", "country", "lat", "lon", "store_number"]
+            ),
+            "name": merchant.upper(),
+            "payment_meta": dict.fromkeys(
+                ["reference_number", "ppd_id", "payee", "by_order_of", "payer",
+                 "payment_method", "payment_processor", "reason"]
+            ),
+            "pending": False,
+            "pending_transaction_id": None,
+            "account_owner": None,
+            "transaction_id": transaction_id,
+            "authorized_date": day.isoformat(),
+            "authorized_datetime": None,
+            "datetime": None,
+            "payment_channel": "in store",
+            "transaction_code": None,
+            "merchant_name": merchant,
+            "personal_finance_category": {
+                "primary": category,
+                "detailed": f"{category}_OTHER",
+                "confidence_level": "HIGH",
+            },
+        }
+
+    def _add(self, item, account_id):
+        transaction = self._transaction(item, account_id)
+        item.live[transaction["transaction_id"]] = transaction
+        item.events.append(("added", transaction))
+
+    def _append_round(self, item):
+        for account in item.accounts:
+            account_id = account["account_id"]
+            for _ in range(self.config.round_size):
+                kind = item.rng.choices(("added", "modified", "removed"), self.config.mix)[0]
+                existing = [t for t in item.live.values() if t["account_id"] == account_id]
+                if kind == "added" or not existing:
+                    self._add(item, account_id)
+                    continue
+                target = item.rng.choice(existing)
+                if kind == "modified":
+                    modified = self._transaction(item, account_id, target["transaction_id"])
+                    item.live[target["transaction_id"]] = modified
+                    item.events.append(("modified", modified))
+                else:
+                    del item.live[target["transaction_id"]]
+                    item.events.append(("removed", target))
+
+    def _new_item(self):
+        index = self.items_created
+        self.items_created += 1
+        item = FakeItem(
+            item_id=f"fake-item-{index}",
+            access_token=f"access-fake-{index}-{uuid.uuid4().hex[:8]}",
+            accounts=[],
+            rng=random.Random(self.config.seed * 1000 + index),
+        )
+        item.accounts = [self._account(item, i) for i in range(self.config.accounts_per_item)]
+        for account in item.accounts:
+            for _ in range(self.config.history_size):
+                self._add(item, account["account_id"])
+        for _ in range(self.config.rounds):
+            self._append_round(item)
+        self.items[item.access_token] = item
+        return item
+
+    # Helpers
+
+    def _item(self, payload):
+        item = self.items.get(payload.get("access_token"))
+        if item is None:
+            raise PlaidError(400, "INVALID_INPUT", "INVALID_ACCESS_TOKEN", "invalid access token")
+        return item
+
+    def _maybe_fail(self, operation):
+        config = self.config
+        if config.error_operations and operation not in config.error_operations:
+            return
+        if config.error_rate and self.rng.random() < config.error_rate:
+            status = self.rng.choice(config.error_statuses)
+            error_type, error_code = _ERRORS_BY_STATUS.get(status, ("API_ERROR", "INTERNAL_SERVER_ERROR"))
+            raise PlaidError(status, error_type, error_code, f"injected {status}")
+
+    def handle(self, operation, payload):
+        """Run one operation; returns the response body or raises PlaidError."""
+        handler = getattr(self, f"op_{operation}", None)
+        if handler is None:
+            raise PlaidError(404, "INVALID_REQUEST", "UNKNOWN_ENDPOINT", f"unknown endpoint {operation}")
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            self._maybe_fail(operation)
+            body = handler(payload)
+        body["request_id"] = uuid.uuid4().hex[:12]
+        return body
+
+    # Operations
+
+    def op_link_token_create(self, payload):
+        expiration = datetime.now(timezone.utc) + timedelta(hours=4)
+        return {
+            "link_token": f"link-fake-{uuid.uuid4().hex}",
+            "expiration": expiration.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+
+    def op_item_public_token_exchange(self, payload):
+        public_token = payload.get("public_token")
+        if not public_token or public_token in self.used_public_tokens:
+            raise PlaidError(400, "INVALID_INPUT", "INVALID_PUBLIC_TOKEN", "invalid public token")
+        self.used_public_tokens.add(public_token)
+        item = self._new_item()
+        return {"access_token": item.access_token, "item_id": item.item_id}
+
+    def op_accounts_get(self, payload):
+        item = self._item(payload)
+        return {
+            "accounts": item.accounts,
+            "item": {
+                "item_id": item.item_id,
+                "webhook": None,
+                "error": None,
+                "available_products": [],
+                "billed_products": ["transactions"],
+                "consent_expiration_time": None,
+                "update_type": "background",
+                "institution_id": "ins_fake",
+                "institution_name": "Fake Bank",
+            },
+        }
+
+    def op_transactions_sync(self, payload):
+        item = self._item(payload)
+        try:
+            offset = int(payload.get("cursor") or 0)
+        except ValueError:
+            raise PlaidError(400, "INVALID_INPUT", "INVALID_CURSOR", "invalid cursor")
+        count = min(int(payload.get("count") or 100), 500)
+        events = item.events[offset:offset + count]
+        next_offset = offset + len(events)
+
+        page = {"added": [], "modified": [], "removed": []}
+        for kind, transaction in events:
+            if kind == "removed":
+                page["removed"].append(
+                    {"transaction_id": transaction["transaction_id"], "account_id": transaction["account_id"]}
+                )
+            else:
+                page[kind].append(transaction)
+        return {
+            **page,
+            "transactions_update_status": "HISTORICAL_UPDATE_COMPLETE",
+            "accounts": item.accounts,
+            "next_cursor": str(next_offset),
+            "has_more": next_offset < len(item.events),
+        }
+
+    def op_transactions_refresh(self, payload):
+        self._append_round(self._item(payload))
+        return {}
+
+    def op_item_remove(self, payload):
+        item = self._item(payload)
+        del self.items[item.access_token]
+        return {}
+
+
+# NOTE: Plaid URL paths for the operations above
+ROUTES = {
+    "/link/token/create": "link_token_create",
+    "/item/public_token/exchange": "item_public_token_exchange",
+    "/accounts/get": "accounts_get",
+    "/transactions/sync": "transactions_sync",
+    "/transactions/refresh": "transactions_refresh",
+    "/item/remove": "item_remove",
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        backend = self.server.backend
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            payload = {}
+
+        config = backend.config
+        if config.latency_ms or config.latency_jitter_ms:
+            time.sleep((config.latency_ms + backend.rng.uniform(0, config.latency_jitter_ms)) / 1000)
+
+        operation = ROUTES.get(self.path.split("?")[0], self.path)
+        try:
+            status, body = 200, backend.handle(operation, payload)
+        except PlaidError as e:
+            status, body = e.status, {**e.body, "request_id": uuid.uuid4().hex[:12]}
+
+        raw = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakePlaidServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server around a FakePlaidBackend. Port 0 picks a free port;
+    `url` is the host to hand to the Plaid client.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, backend=None, host="127.0.0.1", port=0):
+        self.backend = backend or FakePlaidBackend()
+        super().__init__((host, port), _Handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,194 @@
+from datetime import timedelta
+
+from budgetbox_project.settings import PLAID_SYNC_JOB_STALE_AFTER
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .client import plaid_client
+from .models import SyncJob, SyncJobAccount
+from .sync import SyncEngine
+
+
+def fail_stale_jobs(user=None, stale_after=None):
+    """
+    Fail running jobs that stopped reporting progress, e.g. because their worker
+    crashed or was redeployed, so their accounts can be synced again. Progress
+    (account start, every page, account finish) touches SyncJobAccount.updated_at,
+    which serves as the heartbeat. Returns the number of jobs failed.
+    """
+    stale_after = PLAID_SYNC_JOB_STALE_AFTER if stale_after is None else stale_after
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale = SyncJob.objects.filter(status=SyncJob.Status.RUNNING, started_at__lt=cutoff)
+    if user is not None:
+        stale = stale.filter(user=user)
+    stale = stale.exclude(accounts__updated_at__gte=cutoff)
+    failed = 0
+    with db_transaction.atomic():
+        for job in stale.select_for_update(skip_locked=True):
+            fail_sync_job(job, f"No progress for {stale_after}s; the sync worker stopped")
+            failed += 1
+    return failed
+
+
+def _claim_accounts(user, bank_accounts, refresh, status):
+    """
+    Create a job holding whichever of `bank_accounts` aren't queued or running
+    in another job. The partial unique constraint on SyncJobAccount is the
+    per-account lock shared by background and inline syncs: a concurrent claim
+    of the same account becomes a skipped row rather than a duplicate sync.
+    Returns the job, or None if every account is busy.
+    """
+    fail_stale_jobs(user)
+    active = set(
+        SyncJobAccount.objects.filter(
+            bank_account__in=bank_accounts, status__in=SyncJob.ACTIVE_STATUSES
+        ).values_list("bank_account_id", flat=True)
+    )
+    pending = [account for account in bank_accounts if account.id not in active]
+    if not pending:
+        return None
+
+    with db_transaction.atomic():
+        job = SyncJob.objects.create(
+            user=user,
+            refresh=refresh,
+            status=status,
+            started_at=timezone.now() if status == SyncJob.Status.RUNNING else None,
+        )
+        SyncJobAccount.objects.bulk_create(
+            [SyncJobAccount(job=job, bank_account=account) for account in pending],
+            ignore_conflicts=True,
+        )
+        if job.accounts.exists():
+            return job
+        job.delete()
+    return None
+
+
+def enqueue_sync_job(user, bank_accounts, refresh=False):
+    """
+    Queue a background sync for `bank_accounts` and return `(job, created)`.
+
+    Accounts already queued or running in another job are left out. If that
+    leaves nothing to do, the existing active job is returned instead, so
+    repeated clicks don't sync the same account twice.
+    """
+    bank_accounts = [account for account in bank_accounts if account.plaid_access_token]
+    if bank_accounts:
+        job = _claim_accounts(user, bank_accounts, refresh, SyncJob.Status.QUEUED)
+        if job is not None:
+            return job, True
+
+    active_job = (
+        SyncJob.objects.filter(
+            user=user,
+            status__in=SyncJob.ACTIVE_STATUSES,
+            accounts__bank_account__in=bank_accounts,
+        )
+        .order_by("created_at")
+        .first()
+    )
+    return active_job, False
+
+
+def claim_next_job():
+    """Atomically move the oldest queued job to running; None if the queue is empty."""
+    with db_transaction.atomic():
+        job = (
+            SyncJob.objects.select_for_update(skip_locked=True)
+            .filter(status=SyncJob.Status.QUEUED)
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = SyncJob.Status.RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "started_at"])
+    return job
+
+
+def start_inline_sync_job(user, bank_accounts, refresh=False):
+    """
+    Claim `bank_accounts` for a sync run inside the request, under the same
+    per-account lock as the background queue. Returns `(job, busy)`: the job to
+    pass to run_sync_job (None if nothing could be claimed) and the accounts
+    left out because another sync holds them.
+    """
+    bank_accounts = [account for account in bank_accounts if account.plaid_access_token]
+    job = None
+    if bank_accounts:
+        job = _claim_accounts(user, bank_accounts, refresh, SyncJob.Status.RUNNING)
+    claimed = set(job.accounts.values_list("bank_account_id", flat=True)) if job else set()
+    return job, [account for account in bank_accounts if account.id not in claimed]
+
+
+def run_sync_job(job, client=plaid_client, on_page=None):
+    """
+    Run a claimed job, recording status and page-by-page progress on each of
+    its SyncJobAccount rows as the sync goes. `on_page(bank_account, page)` is
+    also called for each applied page.
+    """
+    job_accounts = {
+        job_account.bank_account_id: job_account
+        for job_account in job.accounts.select_related("bank_account")
+    }
+
+    def _update(bank_account, **fields):
+        SyncJobAccount.objects.filter(pk=job_accounts[bank_account.id].pk).update(
+            updated_at=timezone.now(), **fields
+        )
+
+    def on_account_start(bank_account):
+        _update(bank_account, status=SyncJob.Status.RUNNING, started_at=timezone.now())
+
+    def record_page(bank_account, page):
+        if on_page is not None:
+            on_page(bank_account, page)
+        _update(
+            bank_account,
+            pages=F("pages") + 1,
+            created=F("created") + len(page.created),
+            updated=F("updated") + page.updated,
+            removed=F("removed") + page.removed,
+        )
+
+    def on_account_finish(outcome):
+        _update(
+            outcome.bank_account,
+            status=SyncJob.Status.FAILED if outcome.error else SyncJob.Status.SUCCEEDED,
+            last_error=str(outcome.error) if outcome.error else "",
+            finished_at=timezone.now(),
+        )
+
+    engine = SyncEngine(
+        client,
+        refresh=job.refresh,
+        on_account_start=on_account_start,
+        on_page=record_page,
+        on_account_finish=on_account_finish,
+    )
+    outcomes = engine.sync_accounts(
+        job.user, [job_account.bank_account for job_account in job_accounts.values()]
+    )
+
+    failed = any(outcome.error is not None for outcome in outcomes)
+    job.status = SyncJob.Status.FAILED if failed else SyncJob.Status.SUCCEEDED
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "finished_at"])
+    return outcomes
+
+
+def fail_sync_job(job, error):
+    """Mark a job and any of its unfinished accounts as failed."""
+    now = timezone.now()
+    job.accounts.filter(status__in=SyncJob.ACTIVE_STATUSES).update(
+        status=SyncJob.Status.FAILED,
+        last_error=str(error),
+        finished_at=now,
+        updated_at=now,
+    )
+    job.status = SyncJob.Status.FAILED
+    job.finished_at = now
+    job.save(update_fields=["status", "finished_at"])
@@ -0,0 +1,64 @@
+from budgetbox_project.renderers import ORJSONRenderer
+from django.core.management.base import BaseCommand
+from entries.serializers import expense_stream_reader
+from rest_framework.renderers import JSONRenderer
+
+from plaid_app.serializers import transaction_reader
+
+from .bench_serializers import _as_rows, _expenses, _per_row_us, _transactions
+
+
+def _payloads(rows):
+    transactions = transaction_reader.serialize_rows(
+        _as_rows(transaction_reader, _transactions(rows))
+    )
+    streams = expense_stream_reader.serialize_rows(
+        _as_rows(expense_stream_reader, _expenses(rows))
+    )
+    return [
+        (
+            "transactions list",
+            {
+                "transactions": transactions,
+                "count": len(transactions),
+                "has_more": True,
+                "next_cursor": "eyJkIjoiMjAyNS0wNy0wMSIsImlkIjoxfQ",
+            },
+        ),
+        (
+            "budget snapshot",
+            {
+                "budget": {"id": 1, "name": "My Budget", "date": "2025-07-01"},
+                "streams": streams,
+                "expenses": streams,
+                "incomes": [],
+                "totals": {"income": "0.00", "expenses": "-45.10", "net": "45.10"},
+            },
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's JSONRenderer with the orjson renderer on transaction list "
+        "and budget snapshot payloads. No database needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat = options["repeat"]
+
+        for name, payload in _payloads(rows):
+            results = {}
+            for label, renderer in (("drf", JSONRenderer()), ("orjson", ORJSONRenderer())):
+                results[label] = _per_row_us(lambda: renderer.render(payload), rows, repeat)
+
+            self.stdout.write(
+                f"{name}: drf {results['drf']:.2f}us/row, orjson {results['orjson']:.2f}us/row "
+                f"({results['drf'] / results['orjson']:.1f}x) over {rows} rows, "
+                f"{len(ORJSONRenderer().render(payload)) // 1024} KiB"
+            )
@@ -0,0 +1,104 @@
+import time
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from entries.models import Budget, ExpenseStream
+from entries.serializers import ExpanseStream_serializer, expense_stream_reader
+
+from plaid_app.models import BankAccount, Transaction
+from plaid_app.serializers import TransactionSerializer, transaction_reader
+
+
+def _transactions(rows):
+    bank_account = BankAccount(
+        id=1, account_name="Checking", institution_name="Test Bank"
+    )
+    now = datetime(2025, 7, 1, 12, 0, tzinfo=timezone.utc)
+    return [
+        Transaction(
+            id=i,
+            bank_account=bank_account,
+            amount=Decimal("12.34"),
+            merchant_name=f"Merchant {i}",
+            authorized_date=date(2025, 7, 1 + i % 28),
+            date_paid=date(2025, 7, 1 + i % 28),
+            category="FOOD_AND_DRINK",
+            plaid_transaction_id=f"txn-{i}",
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(rows)
+    ]
+
+
+def _expenses(rows):
+    budget = Budget(id=1)
+    return [
+        ExpenseStream(
+            id=i,
+            budget=budget,
+            merchant_name=f"Store {i}",
+            description="weekly",
+            amount=Decimal("-45.10"),
+            category="expense",
+        )
+        for i in range(rows)
+    ]
+
+
+def _as_rows(reader, instances):
+    # NOTE: Stand-in for values_list(*reader.lookups) without a database
+    def lookup(instance, path):
+        *relations, name = path.split("__")
+        for part in relations:
+            instance = getattr(instance, part)
+        return getattr(instance, instance._meta.get_field(name).attname)
+
+    return [
+        tuple(lookup(instance, path) for path in reader.lookups)
+        for instance in instances
+    ]
+
+
+def _per_row_us(func, rows, repeat):
+    best = min(_timed(func) for _ in range(repeat))
+    return best / rows * 1_000_000
+
+
+def _timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-row serialization cost of the DRF serializers and the "
+        "values()-based fast readers used by the list endpoints. No database needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat = options["repeat"]
+
+        cases = [
+            ("transactions", TransactionSerializer, transaction_reader, _transactions(rows)),
+            ("expense streams", ExpanseStream_serializer, expense_stream_reader, _expenses(rows)),
+        ]
+        for name, serializer_class, reader, instances in cases:
+            value_rows = _as_rows(reader, instances)
+
+            drf = _per_row_us(
+                lambda: serializer_class(instances, many=True).data, rows, repeat
+            )
+            fast = _per_row_us(lambda: reader.serialize_rows(value_rows), rows, repeat)
+
+            self.stdout.write(
+                f"{name}: drf {drf:.1f}us/row, fast {fast:.1f}us/row "
+                f"({drf / fast:.1f}x) over {rows} rows"
+            )
@@ -0,0 +1,102 @@
+import json
+import time
+
+from budgetbox_project.settings import PLAID_SYNC_MAX_WORKERS
+from clerk_app.services import get_or_create_budgetbox_user
+from django.core.management.base import BaseCommand
+from plaid.model.accounts_get_request import AccountsGetRequest
+from plaid.model.item_public_token_exchange_request import \
+    ItemPublicTokenExchangeRequest
+
+from plaid_app.client import create_plaid_client
+from plaid_app.fake_plaid import FakePlaidBackend, FakePlaidServer
+from plaid_app.models import create_bank_account_from_plaid
+from plaid_app.sync import SYNC_BATCH_SIZE, SYNC_PAGE_SIZE, SyncEngine
+
+from .fake_plaid_server import add_fake_plaid_arguments, config_from_options
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure sync throughput offline: start the fake Plaid server in-process, "
+        "link --items items for --clerk-user-id and run the SyncEngine over them. "
+        "The user's existing bank accounts and transactions are deleted first, so "
+        "point it at a development database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clerk-user-id", default="bench_sync_user")
+        parser.add_argument("--items", type=int, default=4)
+        parser.add_argument(
+            "--refreshes",
+            type=int,
+            default=1,
+            help="Incremental syncs after the initial one, each preceded by transactions_refresh.",
+        )
+        parser.add_argument("--page-size", type=int, default=SYNC_PAGE_SIZE)
+        parser.add_argument("--batch-size", type=int, default=SYNC_BATCH_SIZE)
+        parser.add_argument("--workers", type=int, default=PLAID_SYNC_MAX_WORKERS)
+        add_fake_plaid_arguments(parser)
+
+    def handle(self, *args, **options):
+        server = FakePlaidServer(FakePlaidBackend(config_from_options(options))).start()
+        try:
+            # NOTE: No backoff sleeps, so injected errors show up as retries
+            # rather than as idle time
+            client = create_plaid_client(
+                environment=server.url,
+                client_id="fake",
+                secret="fake",
+                pool_size=max(10, options["workers"] * 2),
+                sleep=lambda seconds: None,
+            )
+            user = get_or_create_budgetbox_user(options["clerk_user_id"])
+            user.bank_accounts.all().delete()
+            bank_accounts = [
+                account
+                for i in range(options["items"])
+                for account in self._link_item(client, user, f"public-bench-{i}")
+            ]
+
+            for run in range(options["refreshes"] + 1):
+                engine = SyncEngine(
+                    client,
+                    refresh=run > 0,
+                    page_size=options["page_size"],
+                    batch_size=options["batch_size"],
+                    max_workers=options["workers"],
+                )
+                start = time.perf_counter()
+                outcomes = engine.sync_accounts(user, bank_accounts)
+                elapsed = time.perf_counter() - start
+
+                for outcome in outcomes:
+                    if outcome.error is not None:
+                        self.stderr.write(f"{outcome.bank_account.account_name}: {outcome.error}")
+                metrics = engine.metrics.as_dict()
+                changes = sum(metrics["counters"].get(name, 0) for name in ("created", "updated", "removed"))
+                label = "initial sync" if run == 0 else f"refresh {run}"
+                self.stdout.write(
+                    f"{label}: {changes} changes in {elapsed:.2f}s "
+                    f"({changes / elapsed:.0f} changes/s)"
+                )
+                self.stdout.write(json.dumps(metrics, indent=2))
+
+            self.stdout.write(json.dumps({"plaid_calls": client.metrics.as_dict()}, indent=2))
+        finally:
+            server.stop()
+
+    def _link_item(self, client, user, public_token):
+        exchange = client.item_public_token_exchange(
+            ItemPublicTokenExchangeRequest(public_token=public_token)
+        )
+        access_token = exchange["access_token"]
+        accounts = client.accounts_get(AccountsGetRequest(access_token=access_token))
+        institution_name = accounts["item"]["institution_name"]
+        linked = []
+        for account_data in accounts["accounts"]:
+            account_data["item_id"] = exchange["item_id"]
+            linked.append(
+                create_bank_account_from_plaid(user, account_data, access_token, institution_name)
+            )
+        return linked
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from plaid_app.fake_plaid import FakePlaidBackend, FakePlaidConfig, FakePlaidServer
+
+
+def _floats(value):
+    return tuple(float(part) for part in value.split(","))
+
+
+def _ints(value):
+    return tuple(int(part) for part in value.split(","))
+
+
+def add_fake_plaid_arguments(parser):
+    defaults = FakePlaidConfig()
+    parser.add_argument("--accounts", type=int, default=defaults.accounts_per_item,
+                        help="Accounts per exchanged item.")
+    parser.add_argument("--history-size", type=int, default=defaults.history_size,
+                        help="Initial transactions per account.")
+    parser.add_argument("--rounds", type=int, default=defaults.rounds,
+                        help="Update rounds pending when an item is exchanged.")
+    parser.add_argument("--round-size", type=int, default=defaults.round_size,
+                        help="Events per account in each update round.")
+    parser.add_argument("--mix", type=_floats, default=defaults.mix,
+                        help="Added,modified,removed weights of update rounds, e.g. 0.5,0.3,0.2.")
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.latency_jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate,
+                        help="Probability of failing a call, 0-1.")
+    parser.add_argument("--error-statuses", type=_ints, default=defaults.error_statuses,
+                        help="Comma separated HTTP statuses of injected errors.")
+    parser.add_argument("--error-operations", default="",
+                        help="Comma separated operations to inject errors into (default: all).")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def config_from_options(options):
+    if len(options["mix"]) != 3:
+        raise CommandError("--mix needs three weights: added,modified,removed")
+    return FakePlaidConfig(
+        accounts_per_item=options["accounts"],
+        history_size=options["history_size"],
+        rounds=options["rounds"],
+        round_size=options["round_size"],
+        mix=options["mix"],
+        latency_ms=options["latency_ms"],
+        latency_jitter_ms=options["jitter_ms"],
+        error_rate=options["error_rate"],
+        error_statuses=options["error_statuses"],
+        error_operations=tuple(filter(None, options["error_operations"].split(","))),
+        seed=options["seed"],
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a local fake of the Plaid API with synthetic transaction histories. "
+        "Point the app at it with PLAID_ENV=http://127.0.0.1:<port>; any public "
+        "token can be exchanged once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        add_fake_plaid_arguments(parser)
+
+    def handle(self, *args, **options):
+        backend = FakePlaidBackend(config_from_options(options))
+        server = FakePlaidServer(backend, host=options["host"], port=options["port"])
+        self.stdout.write(f"Fake Plaid listening on {server.url} (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Calls served: {backend.calls}")
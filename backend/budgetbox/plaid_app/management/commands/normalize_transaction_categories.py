@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from plaid_app.models import Transaction, normalize_category
+
+
+class Command(BaseCommand):
+    help = "Rewrite stored transaction categories into their normalized form."
+
+    def handle(self, *args, **options):
+        stored = Transaction.objects.values_list("category", flat=True).distinct()
+        updated = 0
+        # NOTE: One UPDATE per distinct legacy value rather than one per row
+        for category in list(stored):
+            normalized = normalize_category(category)
+            if normalized != category:
+                updated += Transaction.objects.filter(category=category).update(
+                    category=normalized
+                )
+        self.stdout.write(self.style.SUCCESS(f"Normalized {updated} transaction(s)."))
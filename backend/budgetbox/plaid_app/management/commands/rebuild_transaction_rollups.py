@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from plaid_app.rollups import rebuild_rollups
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Regenerate the monthly transaction rollups from scratch, for one user or everyone."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Clerk user id or email; defaults to all users.")
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["user"]:
+            user_ids = list(
+                User.objects.filter(
+                    Q(clerk_user_id=options["user"]) | Q(email=options["user"])
+                ).values_list("id", flat=True)
+            )
+            if not user_ids:
+                raise CommandError(f"User {options['user']!r} not found")
+
+        rows = rebuild_rollups(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} rollup row(s)."))
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from plaid_app.jobs import claim_next_job, fail_stale_jobs, fail_sync_job, run_sync_job
+
+
+class Command(BaseCommand):
+    help = "Process queued Plaid sync jobs from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the jobs currently queued, then exit.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            # NOTE: Frees accounts held by jobs whose worker died mid-sync
+            stale = fail_stale_jobs()
+            if stale:
+                self.stderr.write(f"Failed {stale} stale sync job(s)")
+            job = claim_next_job()
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll_interval"])
+                continue
+
+            self.stdout.write(f"Running sync job {job.id} for user {job.user_id}")
+            try:
+                run_sync_job(job)
+            except Exception as e:
+                fail_sync_job(job, e)
+                self.stderr.write(f"Sync job {job.id} failed: {e}")
+                continue
+            self.stdout.write(f"Sync job {job.id} finished: {job.status}")
@@ -0,0 +1,63 @@
+import json
+
+from budgetbox_project.settings import PLAID_SYNC_MAX_WORKERS
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from plaid_app.client import plaid_client
+from plaid_app.sync import SYNC_BATCH_SIZE, SYNC_PAGE_SIZE, SyncEngine
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Sync Plaid transactions for one user or all users and report timings."
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument("--user", help="Clerk user id or email of the user to sync.")
+        target.add_argument("--all", action="store_true", help="Sync every user.")
+        parser.add_argument(
+            "--refresh",
+            action="store_true",
+            help="Call transactions_refresh before syncing each account.",
+        )
+        parser.add_argument("--page-size", type=int, default=SYNC_PAGE_SIZE)
+        parser.add_argument("--batch-size", type=int, default=SYNC_BATCH_SIZE)
+        parser.add_argument("--workers", type=int, default=PLAID_SYNC_MAX_WORKERS)
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            users = User.objects.filter(bank_accounts__is_active=True).distinct()
+        else:
+            users = User.objects.filter(
+                Q(clerk_user_id=options["user"]) | Q(email=options["user"])
+            )
+            if not users.exists():
+                raise CommandError(f"User {options['user']!r} not found")
+
+        engine = SyncEngine(
+            plaid_client,
+            refresh=options["refresh"],
+            page_size=options["page_size"],
+            batch_size=options["batch_size"],
+            max_workers=options["workers"],
+        )
+
+        for user in users:
+            outcomes = engine.sync_accounts(user, user.bank_accounts.filter(is_active=True))
+            for outcome in outcomes:
+                account = outcome.bank_account.account_name
+                if outcome.error is not None:
+                    self.stderr.write(f"{user.email} / {account}: {outcome.error}")
+                    continue
+                result = outcome.result
+                self.stdout.write(
+                    f"{user.email} / {account}: {result.pages} page(s), "
+                    f"{result.created} created, {result.updated} updated, "
+                    f"{result.removed} removed"
+                )
+
+        metrics = {**engine.metrics.as_dict(), "plaid_calls": plaid_client.metrics.as_dict()}
+        self.stdout.write(json.dumps(metrics, indent=2))
@@ -1,5 +1,42 @@
+from decimal import ROUND_HALF_UP, Decimal
+
 from django.conf import settings
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.utils import timezone
+
+
+class TransactionCategory(models.TextChoices):
+    """Plaid's personal_finance_category.primary values, stored as-is."""
+
+    INCOME = "INCOME", "Income"
+    TRANSFER_IN = "TRANSFER_IN", "Transfer in"
+    TRANSFER_OUT = "TRANSFER_OUT", "Transfer out"
+    LOAN_PAYMENTS = "LOAN_PAYMENTS", "Loan payments"
+    BANK_FEES = "BANK_FEES", "Bank fees"
+    ENTERTAINMENT = "ENTERTAINMENT", "Entertainment"
+    FOOD_AND_DRINK = "FOOD_AND_DRINK", "Food and drink"
+    GENERAL_MERCHANDISE = "GENERAL_MERCHANDISE", "General merchandise"
+    HOME_IMPROVEMENT = "HOME_IMPROVEMENT", "Home improvement"
+    MEDICAL = "MEDICAL", "Medical"
+    PERSONAL_CARE = "PERSONAL_CARE", "Personal care"
+    GENERAL_SERVICES = "GENERAL_SERVICES", "General services"
+    GOVERNMENT_AND_NON_PROFIT = "GOVERNMENT_AND_NON_PROFIT", "Government and non-profit"
+    TRANSPORTATION = "TRANSPORTATION", "Transportation"
+    TRAVEL = "TRAVEL", "Travel"
+    RENT_AND_UTILITIES = "RENT_AND_UTILITIES", "Rent and utilities"
+    UNCATEGORIZED = "UNCATEGORIZED", "Uncategorized"
+
+
+def normalize_category(value):
+    """
+    Normalize a category to the stored form: upper snake case, so that
+    "Food and drink", "food_and_drink" and "FOOD_AND_DRINK" all match exactly.
+    """
+    normalized = "_".join(str(value or "").replace("-", " ").split()).upper()
+    return normalized or TransactionCategory.UNCATEGORIZED
+
+
 class BankAccount(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="bank_accounts"
@@ -44,7 +81,12 @@ class Transaction(models.Model):
     authorized_date = models.DateField(null=True)
     date_paid = models.DateField(blank=True, null=True)
 
-    category = models.CharField(max_length=100, blank=True, default="Uncategorized")
+    # NOTE: Always stored through normalize_category so filters can match exactly
+    category = models.CharField(
+        max_length=100,
+        choices=TransactionCategory.choices,
+        default=TransactionCategory.UNCATEGORIZED,
+    )
     
     plaid_transaction_id = models.CharField(max_length=255, unique=True)
     plaid_account_id = models.CharField(max_length=255, blank=True, null=True)
@@ -53,16 +95,92 @@ class Transaction(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ["-authorized_date"]
+        ordering = ["-authorized_date", "-id"]
         indexes = [
-            models.Index(fields=['user', 'authorized_date']),
+            # NOTE: Back the keyset pagination in Transactions.get, with and without
+            # a category filter (see plaid_app/pagination.py)
+            models.Index(fields=['user', '-authorized_date', '-id']),
+            models.Index(fields=['user', 'category', '-authorized_date', '-id']),
             models.Index(fields=['plaid_account_id']),
+            # NOTE: Lets the per-user category prefix searches (user_id = ? AND
+            # category LIKE 'FOOD%') use an index
+            models.Index(
+                models.F('user'),
+                OpClass('category', name='varchar_pattern_ops'),
+                name='plaid_txn_category_prefix_idx',
+            ),
         ]
 
     def __str__(self):
         return f"{self.merchant_name} - {self.amount}"
 
 
+class TransactionListVersion(models.Model):
+    """
+    Per-user change counter for the transactions list, read by its conditional
+    GET instead of aggregating the user's transactions. Edits, deletions,
+    unlinks, approvals and un-approvals bump it through
+    `bump_transaction_list_version`; syncs move BankAccount.last_synced instead.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="transaction_list_version",
+    )
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user_id}: v{self.version}"
+
+
+def bump_transaction_list_version(user_id):
+    """
+    Bump the user's transactions list version. Call it in the same database
+    transaction as the change (or after it commits), never before, so a reader
+    can't pair the new version with the old data.
+    """
+    changes = {"version": models.F("version") + 1, "updated_at": timezone.now()}
+    versions = TransactionListVersion.objects.filter(user_id=user_id)
+    if not versions.update(**changes):
+        # NOTE: First change for this user; a concurrent first bump may win the
+        # insert, so the increment below runs either way
+        TransactionListVersion.objects.bulk_create(
+            [TransactionListVersion(user_id=user_id)], ignore_conflicts=True
+        )
+        versions.update(**changes)
+
+
+class MonthlyCategoryRollup(models.Model):
+    """
+    Per user/month/category sums of Transaction amounts, maintained incrementally
+    by plaid_app/rollups.py. `rebuild_transaction_rollups` regenerates it.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="transaction_rollups"
+    )
+    # NOTE: First day of the month of the transactions' authorized_date
+    month = models.DateField()
+    category = models.CharField(max_length=100, choices=TransactionCategory.choices)
+    total = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["month", "category"]
+        constraints = [
+            # NOTE: Also serves the per-user month range scans of the dashboard
+            models.UniqueConstraint(
+                fields=["user", "month", "category"], name="plaid_rollup_user_month_category"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.category}: {self.total} ({self.count})"
+
+
 def create_bank_account_from_plaid(
     user, account_data, access_token, institution_name="Unknown Bank"
 ):
@@ -77,86 +195,118 @@ def create_bank_account_from_plaid(
         mask=account_data.get("mask", ""),
         institution_name=institution_name,
     )
+    # NOTE: Create the list version up front so later bumps are a single UPDATE
+    TransactionListVersion.objects.bulk_create(
+        [TransactionListVersion(user=user)], ignore_conflicts=True
+    )
     return bank_account
 
 
-def create_transaction_from_plaid(user, bank_account, transaction_data):
+CENTS = Decimal("0.01")
+
+
+def round_amount(value):
     """
-    Create transaction from Plaid data - designed for TransactionsSyncRequest
-    
-    The sync endpoint provides transaction_id as the stable identifier,
-    so we use get_or_create with plaid_transaction_id as the lookup field.
+    Round an amount to cents the way Postgres rounds numeric(10, 2) (half away
+    from zero). Plaid sends floats, so they are read via their shortest repr.
+    """
+    return Decimal(str(value)).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def transaction_fields_from_plaid(transaction_data):
+    """
+    Map a Plaid transaction (from TransactionsSyncRequest added/modified) onto
+    the Transaction model fields we keep in sync.
     """
     merchant_name = (
         transaction_data.get("merchant_name")
         or transaction_data.get("name")
         or "Unknown Merchant"
     )
-    pfc = transaction_data.get("personal_finance_category", {})
-    category = pfc.get("primary", "Uncategorized")
+    pfc = transaction_data.get("personal_finance_category") or {}
+    category = normalize_category(pfc.get("primary"))
 
     # Use authorized_date as primary, fall back to date if authorized_date is None
     authorized_date = transaction_data.get("authorized_date") or transaction_data.get("date")
     date_paid = transaction_data.get("date")  # Keep for reference
 
-    # Use get_or_create with plaid_transaction_id - this is Plaid's recommended approach
-    transaction, created = Transaction.objects.get_or_create(
-        plaid_transaction_id=transaction_data["transaction_id"],
-        defaults={
-            "user": user,
-            "bank_account": bank_account,
-            "amount": abs(transaction_data["amount"]),
-            "merchant_name": merchant_name,
-            "authorized_date": authorized_date,
-            "date_paid": date_paid,
-            "plaid_account_id": transaction_data.get("account_id", ""),
-            "category": category,
-        }
+    return {
+        # NOTE: Rounded here rather than by the column, so the rollup deltas
+        # computed from these fields match what is stored
+        "amount": round_amount(abs(transaction_data["amount"])),
+        "merchant_name": merchant_name,
+        "authorized_date": authorized_date,
+        "date_paid": date_paid,
+        "category": category,
+        "plaid_account_id": transaction_data.get("account_id", ""),
+    }
+
+
+class SyncJob(models.Model):
+    """A queued Plaid transactions sync for one user, run by `run_sync_worker`."""
+
+    class Status(models.TextChoices):
+        QUEUED = "queued"
+        RUNNING = "running"
+        SUCCEEDED = "succeeded"
+        FAILED = "failed"
+
+    ACTIVE_STATUSES = [Status.QUEUED, Status.RUNNING]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="sync_jobs"
+    )
+    # NOTE: Ask Plaid to refresh the item (transactions_refresh) before syncing
+    refresh = models.BooleanField(default=False)
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.QUEUED
     )
-    
-    return transaction, created
 
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
 
-def update_transaction_from_plaid(transaction, transaction_data):
-    """
-    Update existing transaction with modified data from Plaid sync
-    
-    This is called for transactions in the 'modified' array from sync response
-    """
-    merchant_name = (
-        transaction_data.get("merchant_name")
-        or transaction_data.get("name") 
-        or "Unknown Merchant"
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"SyncJob {self.id} ({self.status})"
+
+
+class SyncJobAccount(models.Model):
+    """Per-account status and progress of a SyncJob."""
+
+    job = models.ForeignKey(SyncJob, on_delete=models.CASCADE, related_name="accounts")
+    bank_account = models.ForeignKey(
+        BankAccount, on_delete=models.CASCADE, related_name="sync_jobs"
+    )
+    status = models.CharField(
+        max_length=20, choices=SyncJob.Status.choices, default=SyncJob.Status.QUEUED
     )
-    pfc = transaction_data.get("personal_finance_category", {})
-    category = pfc.get("primary", "Uncategorized")
-    
-    authorized_date = transaction_data.get("authorized_date") or transaction_data.get("date")
-    date_paid = transaction_data.get("date")
-    
-    # Update fields that might have changed
-    transaction.amount = abs(transaction_data["amount"])
-    transaction.merchant_name = merchant_name
-    transaction.authorized_date = authorized_date
-    transaction.date_paid = date_paid
-    transaction.category = category
-    transaction.plaid_account_id = transaction_data.get("account_id", "")
-    
-    transaction.save()
-    return transaction
 
+    pages = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    removed = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
 
-def delete_transaction_from_plaid(transaction_id):
-    """
-    Delete transaction based on Plaid transaction_id
-    
-    This is called for transactions in the 'removed' array from sync response
-    """
-    try:
-        transaction = Transaction.objects.get(plaid_transaction_id=transaction_id)
-        transaction.delete()
-        return True
-    except Transaction.DoesNotExist:
-        # Transaction doesn't exist in our database, which is fine
-        return False
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        ordering = ["id"]
+        constraints = [
+            # NOTE: An account can only be queued or running in one job at a time
+            models.UniqueConstraint(
+                fields=["bank_account"],
+                condition=models.Q(status__in=["queued", "running"]),
+                name="unique_active_sync_per_account",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.bank_account} in job {self.job_id} ({self.status})"
@@ -0,0 +1,133 @@
+"""
+Incremental maintenance of MonthlyCategoryRollup.
+
+Writers collect the changes they make to a user's transactions into RollupDeltas
+and call `apply_rollup_deltas` in the same database transaction, so rollups
+commit or roll back together with the transactions they summarize.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import TruncMonth
+
+from .models import MonthlyCategoryRollup, Transaction, round_amount
+
+# NOTE: Transaction columns that decide which rollup row a transaction counts toward
+ROLLUP_FIELDS = {"authorized_date", "category", "amount"}
+
+
+class RollupDeltas:
+    """(month, category) -> [total, count] changes to one user's rollups."""
+
+    def __init__(self):
+        self.changes = defaultdict(lambda: [Decimal("0.00"), 0])
+
+    def add(self, authorized_date, category, amount, sign=1):
+        # NOTE: Undated transactions don't belong to any month
+        if authorized_date is None:
+            return
+        change = self.changes[(authorized_date.replace(day=1), category)]
+        change[0] += sign * round_amount(amount)
+        change[1] += sign
+
+    def add_transaction(self, transaction, sign=1):
+        self.add(transaction.authorized_date, transaction.category, transaction.amount, sign)
+
+    def remove_transaction(self, transaction):
+        self.add_transaction(transaction, sign=-1)
+
+    def remove_queryset(self, queryset):
+        """Subtract everything in `queryset`, read as one grouped query."""
+        rows = (
+            queryset.order_by()
+            .filter(authorized_date__isnull=False)
+            .values("category", rollup_month=TruncMonth("authorized_date"))
+            .annotate(total=Sum("amount"), count=Count("id"))
+        )
+        for row in rows:
+            change = self.changes[(row["rollup_month"], row["category"])]
+            change[0] -= row["total"]
+            change[1] -= row["count"]
+
+    def nonzero(self):
+        return {key: change for key, change in self.changes.items() if change[0] or change[1]}
+
+
+def apply_rollup_deltas(user_id, deltas):
+    """
+    Add `deltas` to the user's rollup rows in two statements: an insert of any
+    missing rows, then a single UPDATE incrementing each row in place. The
+    increments are atomic, so concurrent syncs of the user's items can't lose
+    each other's changes.
+    """
+    changes = deltas.nonzero()
+    if not changes:
+        return 0
+
+    MonthlyCategoryRollup.objects.bulk_create(
+        [
+            MonthlyCategoryRollup(user_id=user_id, month=month, category=category)
+            for month, category in changes
+        ],
+        ignore_conflicts=True,
+    )
+    rows = Q()
+    total_cases, count_cases = [], []
+    for (month, category), (total, count) in changes.items():
+        key = Q(month=month, category=category)
+        rows |= key
+        total_cases.append(When(key, then=Value(total)))
+        count_cases.append(When(key, then=Value(count)))
+    return MonthlyCategoryRollup.objects.filter(rows, user_id=user_id).update(
+        total=F("total") + Case(
+            *total_cases, default=Value(Decimal("0.00")),
+            output_field=DecimalField(max_digits=20, decimal_places=2),
+        ),
+        count=F("count") + Case(*count_cases, default=Value(0), output_field=IntegerField()),
+    )
+
+
+def rebuild_rollups(user_ids=None):
+    """
+    Regenerate rollups from Transaction, for `user_ids` or everyone. Returns the
+    number of rows written.
+    """
+    transactions = Transaction.objects.order_by().filter(authorized_date__isnull=False)
+    rollups = MonthlyCategoryRollup.objects.all()
+    if user_ids is not None:
+        transactions = transactions.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    rows = (
+        transactions.values("user_id", "category", rollup_month=TruncMonth("authorized_date"))
+        .annotate(total=Sum("amount"), count=Count("id"))
+    )
+    with db_transaction.atomic():
+        rollups.delete()
+        created = MonthlyCategoryRollup.objects.bulk_create(
+            (
+                MonthlyCategoryRollup(
+                    user_id=row["user_id"],
+                    month=row["rollup_month"],
+                    category=row["category"],
+                    total=row["total"],
+                    count=row["count"],
+                )
+                for row in rows.iterator()
+            ),
+            batch_size=1000,
+        )
+    return len(created)
+
+
+def user_rollups(user, start, end, categories=None):
+    """Non-empty rollup rows for months `start`..`end` (first-of-month dates)."""
+    rollups = MonthlyCategoryRollup.objects.filter(
+        user=user, month__range=(start, end), count__gt=0
+    )
+    if categories:
+        rollups = rollups.filter(category__in=categories)
+    return rollups
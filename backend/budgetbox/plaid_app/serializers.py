@@ -1,6 +1,10 @@
+from datetime import datetime
+
+from budgetbox_project.fast_serializers import FastReadSerializer
 from rest_framework import serializers
 
-from .models import BankAccount, Transaction
+from .models import (BankAccount, SyncJob, SyncJobAccount, Transaction,
+                     TransactionCategory, normalize_category)
 
 
 class BankAccountSerializer(serializers.ModelSerializer):
@@ -48,13 +52,25 @@ class TransactionSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "plaid_transaction_id", "created_at", "updated_at"]
 
 
+# NOTE: values()-based fast path for the transactions list; output matches TransactionSerializer
+transaction_reader = FastReadSerializer(TransactionSerializer)
+
+
 class TransactionUpdateSerializer(serializers.ModelSerializer):
     """Serializer for updating transaction details"""
 
+    category = serializers.CharField(max_length=100, required=False)
+
     class Meta:
         model = Transaction
         fields = ["merchant_name", "category", "authorized_date", "date_paid"]
 
+    def validate_category(self, value: str) -> str:
+        category = normalize_category(value)
+        if category not in TransactionCategory.values:
+            raise serializers.ValidationError(f"Unknown category '{value}'.")
+        return category
+
 
 class TransactionApprovalSerializer(serializers.Serializer):
     """Serializer for approving a transaction to create an ExpenseStream entry"""
@@ -71,3 +87,79 @@ class TransactionApprovalSerializer(serializers.Serializer):
                 "Transaction ID must be a positive integer."
             )
         return value
+
+
+# NOTE: Upper bound on transactions approved by one bulk request
+MAX_BULK_APPROVALS = 500
+
+
+class BulkApprovalItemSerializer(TransactionApprovalSerializer):
+    """One item of a bulk approval; `budget_date` overrides the transaction's month"""
+
+    budget_date = serializers.CharField(required=False)
+
+    def validate_budget_date(self, value: str):
+        for fmt in ("%Y-%m", "%Y-%m-%d"):
+            try:
+                return datetime.strptime(value, fmt).date().replace(day=1)
+            except ValueError:
+                continue
+        raise serializers.ValidationError("Invalid budget_date format, expected YYYY-MM or YYYY-MM-DD.")
+
+
+class BulkTransactionApprovalSerializer(serializers.Serializer):
+    """Serializer for approving many transactions into their months' budgets at once"""
+
+    transactions = BulkApprovalItemSerializer(
+        many=True, allow_empty=False, max_length=MAX_BULK_APPROVALS
+    )
+
+    def validate_transactions(self, items):
+        seen = set()
+        for item in items:
+            if item["transaction_id"] in seen:
+                raise serializers.ValidationError(
+                    f"Transaction {item['transaction_id']} is listed more than once."
+                )
+            seen.add(item["transaction_id"])
+        return items
+
+
+class SyncJobAccountSerializer(serializers.ModelSerializer):
+    account_name = serializers.CharField(
+        source="bank_account.account_name", read_only=True
+    )
+
+    class Meta:
+        model = SyncJobAccount
+        fields = [
+            "bank_account",
+            "account_name",
+            "status",
+            "pages",
+            "created",
+            "updated",
+            "removed",
+            "last_error",
+            "started_at",
+            "finished_at",
+        ]
+
+
+class SyncJobSerializer(serializers.ModelSerializer):
+    """Serializer for reporting a background sync job and its per-account progress"""
+
+    job_id = serializers.IntegerField(source="id", read_only=True)
+    accounts = SyncJobAccountSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = SyncJob
+        fields = [
+            "job_id",
+            "status",
+            "refresh",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "accounts",
+        ]
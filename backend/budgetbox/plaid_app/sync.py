@@ -0,0 +1,393 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from budgetbox_project.response_cache import (
+    BUDGET_SCOPE,
+    TRANSACTIONS_SCOPE,
+    invalidate_user_cache,
+)
+from budgetbox_project.settings import PLAID_SYNC_MAX_WORKERS
+from django.db import connection
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from entries.models import bump_linked_budget_versions
+from plaid.model.transactions_refresh_request import TransactionsRefreshRequest
+from plaid.model.transactions_sync_request import TransactionsSyncRequest
+
+from .models import BankAccount, Transaction, transaction_fields_from_plaid
+from .rollups import RollupDeltas, apply_rollup_deltas
+
+# NOTE: Columns refreshed from Plaid on every sync. updated_at is listed explicitly
+# because bulk_update/ON CONFLICT don't run auto_now.
+SYNCED_TRANSACTION_FIELDS = [
+    "amount",
+    "merchant_name",
+    "authorized_date",
+    "date_paid",
+    "category",
+    "plaid_account_id",
+    "updated_at",
+]
+SYNC_BATCH_SIZE = 500
+SYNC_PAGE_SIZE = 500
+
+
+class SyncConflict(Exception):
+    """Another sync moved the account's cursor while this one was running."""
+
+
+@dataclass
+class SyncPage:
+    added: list
+    modified: list
+    removed: list
+    next_cursor: str
+
+
+@dataclass
+class SyncPageResult:
+    created: list = field(default_factory=list)
+    updated: int = 0
+    removed: int = 0
+
+
+@dataclass
+class AccountSyncResult:
+    pages: int = 0
+    created: int = 0
+    updated: int = 0
+    removed: int = 0
+
+
+@dataclass
+class AccountSyncOutcome:
+    bank_account: object
+    result: AccountSyncResult = None
+    error: Exception = None
+
+
+class SyncMetrics:
+    """Thread-safe counters and cumulative timings for one SyncEngine."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.timings = defaultdict(float)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.timings[name] += seconds
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "timings": {name: round(value, 6) for name, value in self.timings.items()},
+            }
+
+
+def _by_transaction_id(transactions_data):
+    # NOTE: Later entries win if Plaid repeats a transaction within one batch
+    return {data["transaction_id"]: data for data in transactions_data}
+
+
+def _upsert_added(user, bank_account, added, now, batch_size, deltas):
+    rows = _by_transaction_id(added)
+    if not rows:
+        return []
+
+    # NOTE: Rows that already exist are overwritten, so their old values leave the rollups
+    existing = {
+        existing.plaid_transaction_id: existing
+        for existing in Transaction.objects.filter(plaid_transaction_id__in=rows).only(
+            "plaid_transaction_id", "authorized_date", "category", "amount"
+        )
+    }
+    for previous in existing.values():
+        deltas.remove_transaction(previous)
+
+    transactions = [
+        Transaction(
+            user=user,
+            bank_account=bank_account,
+            plaid_transaction_id=plaid_transaction_id,
+            created_at=now,
+            updated_at=now,
+            **transaction_fields_from_plaid(data),
+        )
+        for plaid_transaction_id, data in rows.items()
+    ]
+    Transaction.objects.bulk_create(
+        transactions,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["plaid_transaction_id"],
+        update_fields=SYNCED_TRANSACTION_FIELDS,
+    )
+    for transaction in transactions:
+        deltas.add_transaction(transaction)
+    return [t for t in transactions if t.plaid_transaction_id not in existing]
+
+
+def _update_modified(user, modified, now, batch_size, deltas):
+    rows = _by_transaction_id(modified)
+    if not rows:
+        return 0
+
+    transactions = list(
+        Transaction.objects.filter(user=user, plaid_transaction_id__in=rows)
+    )
+    for transaction in transactions:
+        deltas.remove_transaction(transaction)
+        fields = transaction_fields_from_plaid(rows[transaction.plaid_transaction_id])
+        for name, value in fields.items():
+            setattr(transaction, name, value)
+        transaction.updated_at = now
+        deltas.add_transaction(transaction)
+
+    Transaction.objects.bulk_update(
+        transactions, SYNCED_TRANSACTION_FIELDS, batch_size=batch_size
+    )
+    return len(transactions)
+
+
+def _delete_removed(user, removed, deltas):
+    # NOTE: Returns (deleted transactions, budgets whose approved expenses were unlinked)
+    removed_ids = {data["transaction_id"] for data in removed}
+    if not removed_ids:
+        return 0, 0
+    transactions = Transaction.objects.filter(
+        user=user, plaid_transaction_id__in=removed_ids
+    )
+    deltas.remove_queryset(transactions)
+    unlinked_budgets = bump_linked_budget_versions(transactions)
+    deleted, _ = transactions.delete()
+    return deleted, unlinked_budgets
+
+
+def apply_sync_page(user, bank_account, added, modified, removed, batch_size=SYNC_BATCH_SIZE):
+    """
+    Apply one batch of TransactionsSyncRequest results in a single database
+    transaction: one upsert for `added`, one bulk update for `modified` and one
+    DELETE ... IN for `removed`, instead of a round-trip per transaction. The
+    user's monthly rollups are adjusted in the same transaction.
+    Returns the newly created transactions alongside update/removal counts.
+    """
+    now = timezone.now()
+    deltas = RollupDeltas()
+    with db_transaction.atomic():
+        created = _upsert_added(user, bank_account, added, now, batch_size, deltas)
+        updated = _update_modified(user, modified, now, batch_size, deltas)
+        removed_count, unlinked_budgets = _delete_removed(user, removed, deltas)
+        apply_rollup_deltas(user.id, deltas)
+        if created or updated or removed_count:
+            scopes = [TRANSACTIONS_SCOPE]
+            if unlinked_budgets:
+                scopes.append(BUDGET_SCOPE)
+            invalidate_user_cache(user.id, *scopes)
+    return SyncPageResult(created=created, updated=updated, removed=removed_count)
+
+
+def request_transactions_refresh(client, bank_account):
+    """Ask Plaid to check the institution for new transactions before syncing."""
+    refresh_request = TransactionsRefreshRequest(
+        access_token=bank_account.plaid_access_token
+    )
+    client.transactions_refresh(refresh_request)
+
+
+class SyncEngine:
+    """
+    The single Plaid transactions sync path, shared by the sync endpoints, the
+    background worker and the `sync_transactions` command.
+
+    - Batching: `page_size` is the Plaid page size, `batch_size` the bulk write size.
+    - Hooks: `on_account_start(bank_account)`, `on_page(bank_account, page_result)`
+      and `on_account_finish(outcome)`. Hooks may run on worker threads.
+    - Timing/metrics: phases are timed into `self.metrics` and reported to
+      `on_timing(name, seconds)` when given.
+    """
+
+    def __init__(
+        self,
+        client,
+        refresh=False,
+        page_size=SYNC_PAGE_SIZE,
+        batch_size=SYNC_BATCH_SIZE,
+        max_workers=PLAID_SYNC_MAX_WORKERS,
+        on_account_start=None,
+        on_page=None,
+        on_account_finish=None,
+        on_timing=None,
+    ):
+        self.client = client
+        self.refresh = refresh
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.on_account_start = on_account_start
+        self.on_page = on_page
+        self.on_account_finish = on_account_finish
+        self.on_timing = on_timing
+        self.metrics = SyncMetrics()
+
+    @contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.metrics.add_time(name, elapsed)
+            if self.on_timing is not None:
+                self.on_timing(name, elapsed)
+
+    def iter_pages(self, access_token, cursor=""):
+        """
+        Yield TransactionsSyncRequest pages one at a time, following `next_cursor`
+        until Plaid reports `has_more=False`. Only one page is held in memory.
+        """
+        has_more = True
+        while has_more:
+            sync_request = TransactionsSyncRequest(
+                access_token=access_token,
+                cursor=cursor,
+                count=self.page_size,
+            )
+            with self.timed("plaid_sync"):
+                response = self.client.transactions_sync(sync_request)
+
+            cursor = response.get("next_cursor")
+            has_more = response.get("has_more", False)
+            yield SyncPage(
+                added=response.get("added", []),
+                modified=response.get("modified", []),
+                removed=response.get("removed", []),
+                next_cursor=cursor,
+            )
+
+    def apply_page(self, user, bank_account, page):
+        with self.timed("db_apply"):
+            page_result = apply_sync_page(
+                user,
+                bank_account,
+                page.added,
+                page.modified,
+                page.removed,
+                batch_size=self.batch_size,
+            )
+        self.metrics.incr("pages")
+        self.metrics.incr("created", len(page_result.created))
+        self.metrics.incr("updated", page_result.updated)
+        self.metrics.incr("removed", page_result.removed)
+        return page_result
+
+    def sync_account(self, user, bank_account):
+        """
+        Sync one bank account page by page. Each page and the cursor that follows
+        it are committed together, so an interrupted sync resumes from the last
+        committed page instead of starting over.
+
+        Each page is applied with the account row locked and only if the stored
+        cursor is still the one the page was fetched from. A sync racing this one
+        (inline, worker or command) gets a SyncConflict instead of applying the
+        same page, and its rollup deltas, a second time.
+        """
+        if self.refresh:
+            with self.timed("plaid_refresh"):
+                request_transactions_refresh(self.client, bank_account)
+
+        result = AccountSyncResult()
+        cursor = bank_account.sync_cursor or ""
+        pages = self.iter_pages(bank_account.plaid_access_token, cursor)
+        for page in pages:
+            with db_transaction.atomic():
+                stored = (
+                    BankAccount.objects.select_for_update()
+                    .filter(pk=bank_account.pk)
+                    .values_list("sync_cursor", flat=True)
+                    .first()
+                )
+                if (stored or "") != cursor:
+                    raise SyncConflict(
+                        f"{bank_account.account_name} was synced concurrently; try again"
+                    )
+                page_result = self.apply_page(user, bank_account, page)
+                bank_account.sync_cursor = page.next_cursor
+                bank_account.last_synced = timezone.now()
+                bank_account.save(
+                    update_fields=["sync_cursor", "last_synced", "updated_at"]
+                )
+            cursor = page.next_cursor or ""
+
+            result.pages += 1
+            result.created += len(page_result.created)
+            result.updated += page_result.updated
+            result.removed += page_result.removed
+            if self.on_page is not None:
+                self.on_page(bank_account, page_result)
+        return result
+
+    def _sync_item(self, user, bank_accounts):
+        # NOTE: Accounts of the same Plaid item share an access token, so they are
+        # synced one after another to keep per-item concurrency at one
+        outcomes = []
+        for bank_account in bank_accounts:
+            outcome = AccountSyncOutcome(bank_account=bank_account)
+            try:
+                if self.on_account_start is not None:
+                    self.on_account_start(bank_account)
+                with self.timed("account"):
+                    outcome.result = self.sync_account(user, bank_account)
+            except Exception as e:
+                outcome.error = e
+                self.metrics.incr("errors")
+            if self.on_account_finish is not None:
+                self.on_account_finish(outcome)
+            outcomes.append(outcome)
+        return outcomes
+
+    def _sync_item_in_thread(self, user, bank_accounts):
+        try:
+            return self._sync_item(user, bank_accounts)
+        finally:
+            # NOTE: Worker threads get their own DB connection; don't leave it open
+            connection.close()
+
+    def sync_accounts(self, user, bank_accounts):
+        """
+        Sync several bank accounts, fanning Plaid items out across a bounded
+        thread pool so total time approaches that of the slowest item. Errors are
+        captured per account in the returned outcomes rather than aborting the
+        others.
+        """
+        items = defaultdict(list)
+        for bank_account in bank_accounts:
+            if bank_account.plaid_access_token:
+                items[bank_account.plaid_item_id or bank_account.plaid_access_token].append(
+                    bank_account
+                )
+
+        groups = list(items.values())
+        with self.timed("total"):
+            if len(groups) <= 1 or self.max_workers <= 1:
+                return [
+                    outcome
+                    for group in groups
+                    for outcome in self._sync_item(user, group)
+                ]
+
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(groups))) as executor:
+                futures = [
+                    executor.submit(self._sync_item_in_thread, user, group)
+                    for group in groups
+                ]
+                return [outcome for future in futures for outcome in future.result()]
@@ -1 +1,760 @@
-from django.test import TestCase
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+import plaid
+from budgetbox_project.response_cache import reset_response_cache, response_cache_stats
+from clerk_app.services import get_or_create_budgetbox_user, user_cache
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from entries.models import Budget, ExpenseStream
+from rest_framework.test import APIClient
+
+from .client import PlaidClient, create_plaid_client
+from .fake_plaid import FakePlaidBackend, FakePlaidConfig, FakePlaidServer
+from .jobs import claim_next_job, enqueue_sync_job, fail_stale_jobs, run_sync_job
+from .models import (BankAccount, MonthlyCategoryRollup, SyncJob, SyncJobAccount, Transaction,
+                     TransactionListVersion)
+from .pagination import TRANSACTION_ORDERING
+from .rollups import rebuild_rollups
+from .serializers import TransactionSerializer
+from .sync import SyncConflict, SyncEngine, apply_sync_page
+
+
+def plaid_transaction(transaction_id, amount=10.0, merchant="Coffee", primary="FOOD_AND_DRINK", day=1):
+    return {
+        "transaction_id": transaction_id,
+        "account_id": "acc-1",
+        "amount": amount,
+        "merchant_name": merchant,
+        "name": merchant,
+        "authorized_date": date(2025, 7, day),
+        "date": date(2025, 7, day),
+        "personal_finance_category": {"primary": primary},
+    }
+
+
+class PlaidSyncTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(
+            email="sync@example.com", budget_id="b1", clerk_user_id="user_sync"
+        )
+        self.bank_account = BankAccount.objects.create(
+            user=self.user,
+            plaid_account_id="acc-1",
+            plaid_access_token="access-sandbox-1",
+            plaid_item_id="item-1",
+            account_name="Checking",
+            account_type="depository",
+            account_subtype="checking",
+        )
+        # NOTE: As create_bank_account_from_plaid does when an item is linked
+        TransactionListVersion.objects.create(user=self.user)
+
+
+class ApplySyncPageTest(PlaidSyncTestCase):
+    def test_page_is_applied_with_bulk_statements(self):
+        apply_sync_page(
+            self.user,
+            self.bank_account,
+            [plaid_transaction("t1"), plaid_transaction("t2")],
+            [],
+            [],
+        )
+
+        # NOTE: existing-row lookup + upsert, modified lookup + bulk update, grouped read
+        # of the removed rows + a version bump of the budgets approved from them + one
+        # delete (which collects the rows to unlink their approved expense streams
+        # first), rollup insert + increment, plus the savepoint around the page
+        with self.assertNumQueries(13):
+            result = apply_sync_page(
+                self.user,
+                self.bank_account,
+                [plaid_transaction("t3"), plaid_transaction("t1", amount=-12.5)],
+                [plaid_transaction("t2", merchant="Tea")],
+                [{"transaction_id": "t3"}],
+            )
+
+        self.assertEqual([t.plaid_transaction_id for t in result.created], ["t3"])
+        self.assertEqual(result.updated, 1)
+        self.assertEqual(result.removed, 1)
+        self.assertEqual(
+            Transaction.objects.get(plaid_transaction_id="t1").amount, Decimal("12.50")
+        )
+        self.assertEqual(
+            Transaction.objects.get(plaid_transaction_id="t2").merchant_name, "Tea"
+        )
+        self.assertFalse(Transaction.objects.filter(plaid_transaction_id="t3").exists())
+
+
+@mock.patch("budgetbox_project.decorators.decode_token", return_value={"sub": "user_sync"})
+class MonthlyCategoryRollupTest(PlaidSyncTestCase):
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        self.client = APIClient(HTTP_AUTHORIZATION="Bearer token")
+
+    def rollups(self):
+        return set(
+            MonthlyCategoryRollup.objects.filter(count__gt=0).values_list(
+                "month", "category", "total", "count"
+            )
+        )
+
+    def test_incremental_updates_match_a_rebuild(self, _decode):
+        apply_sync_page(
+            self.user,
+            self.bank_account,
+            [plaid_transaction("t1", amount=10.005), plaid_transaction("t2", amount=4.5, day=2),
+             plaid_transaction("t3", primary="TRAVEL")],
+            [],
+            [],
+        )
+        apply_sync_page(
+            self.user,
+            self.bank_account,
+            [plaid_transaction("t1", amount=20.0)],
+            [plaid_transaction("t2", primary="TRAVEL")],
+            [{"transaction_id": "t3"}],
+        )
+        t1 = Transaction.objects.get(plaid_transaction_id="t1")
+        self.client.put("/api/plaid/transactions/", {"id": t1.id, "authorized_date": "2025-08-05"}, format="json")
+        t2 = Transaction.objects.get(plaid_transaction_id="t2")
+        self.client.delete("/api/plaid/transactions/", {"id": t2.id}, format="json")
+        apply_sync_page(self.user, self.bank_account, [plaid_transaction("t4", day=9)], [], [])
+
+        self.assertEqual(
+            self.rollups(),
+            {
+                (date(2025, 7, 1), "FOOD_AND_DRINK", Decimal("10.00"), 1),
+                (date(2025, 8, 1), "FOOD_AND_DRINK", Decimal("20.00"), 1),
+            },
+        )
+        incremental = self.rollups()
+        rebuild_rollups()
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_half_cent_amounts_round_up_in_the_column_and_the_rollup(self, _decode):
+        apply_sync_page(self.user, self.bank_account, [plaid_transaction("t1", amount=10.005)], [], [])
+
+        self.assertEqual(Transaction.objects.get().amount, Decimal("10.01"))
+        self.assertEqual(self.rollups(), {(date(2025, 7, 1), "FOOD_AND_DRINK", Decimal("10.01"), 1)})
+
+    def test_rebuild_command_repairs_drift(self, _decode):
+        apply_sync_page(self.user, self.bank_account, [plaid_transaction("t1")], [], [])
+        MonthlyCategoryRollup.objects.update(total=Decimal("999.00"))
+
+        call_command("rebuild_transaction_rollups", "--user", "user_sync", stdout=StringIO())
+
+        self.assertEqual(self.rollups(), {(date(2025, 7, 1), "FOOD_AND_DRINK", Decimal("10.00"), 1)})
+
+
+class FakeSyncClient:
+    """Stands in for PlaidApi.transactions_sync, serving canned pages by cursor."""
+
+    def __init__(self, pages, fail_on_cursor=None):
+        self.pages = pages
+        self.fail_on_cursor = fail_on_cursor
+        self.requested_cursors = []
+
+    def transactions_sync(self, sync_request):
+        cursor = sync_request.cursor
+        self.requested_cursors.append(cursor)
+        if cursor == self.fail_on_cursor:
+            raise RuntimeError("Plaid unavailable")
+        return self.pages[cursor]
+
+
+class SyncEngineAccountTest(PlaidSyncTestCase):
+    pages = {
+        "": {
+            "added": [plaid_transaction("t1")],
+            "next_cursor": "c1",
+            "has_more": True,
+        },
+        "c1": {
+            "added": [plaid_transaction("t2")],
+            "next_cursor": "c2",
+            "has_more": False,
+        },
+    }
+
+    def test_interrupted_sync_resumes_from_last_committed_page(self):
+        with self.assertRaises(RuntimeError):
+            SyncEngine(FakeSyncClient(self.pages, fail_on_cursor="c1")).sync_account(
+                self.user, self.bank_account
+            )
+
+        self.bank_account.refresh_from_db()
+        self.assertEqual(self.bank_account.sync_cursor, "c1")
+        self.assertTrue(Transaction.objects.filter(plaid_transaction_id="t1").exists())
+
+        client = FakeSyncClient(self.pages)
+        result = SyncEngine(client).sync_account(self.user, self.bank_account)
+
+        self.assertEqual(client.requested_cursors, ["c1"])
+        self.assertEqual(result.created, 1)
+        self.assertEqual(self.bank_account.sync_cursor, "c2")
+
+
+class SyncEngineAccountsTest(TransactionTestCase):
+    def test_items_sync_concurrently_and_errors_stay_per_account(self):
+        user = get_user_model().objects.create(
+            email="multi@example.com", budget_id="b1", clerk_user_id="user_multi"
+        )
+        accounts = [
+            BankAccount.objects.create(
+                user=user,
+                plaid_account_id=f"acc-{i}",
+                plaid_access_token=f"access-{i}",
+                plaid_item_id=f"item-{i}",
+                account_name=f"Account {i}",
+                account_type="depository",
+                account_subtype="checking",
+            )
+            for i in (1, 2)
+        ]
+        # NOTE: Both items must be inside transactions_sync at the same time to pass
+        barrier = threading.Barrier(2, timeout=5)
+
+        class Client:
+            def transactions_sync(self, sync_request):
+                barrier.wait()
+                if sync_request.access_token == "access-2":
+                    raise RuntimeError("ITEM_LOGIN_REQUIRED")
+                return {"added": [plaid_transaction("t1")], "next_cursor": "c1", "has_more": False}
+
+        outcomes = SyncEngine(Client(), max_workers=2).sync_accounts(user, accounts)
+
+        by_account = {outcome.bank_account.plaid_account_id: outcome for outcome in outcomes}
+        self.assertEqual(by_account["acc-1"].result.created, 1)
+        self.assertIsNone(by_account["acc-1"].error)
+        self.assertIsInstance(by_account["acc-2"].error, RuntimeError)
+
+
+@mock.patch("budgetbox_project.decorators.decode_token", return_value={"sub": "user_sync"})
+class BackgroundSyncJobTest(PlaidSyncTestCase):
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        reset_response_cache()
+        self.client = APIClient(HTTP_AUTHORIZATION="Bearer token")
+
+    def test_background_sync_is_queued_once_and_reports_progress(self, _decode):
+        response = self.client.get("/api/plaid/get-transactions/", {"background": "true"})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data["job_id"]
+
+        duplicate = self.client.get("/api/plaid/get-transactions/", {"background": "true"})
+        self.assertEqual(duplicate.data["job_id"], job_id)
+        self.assertEqual(SyncJobAccount.objects.count(), 1)
+
+        job = claim_next_job()
+        run_sync_job(job, client=FakeSyncClient(SyncEngineAccountTest.pages))
+
+        status = self.client.get(f"/api/plaid/sync-jobs/{job_id}/")
+        self.assertEqual(status.data["status"], "succeeded")
+        self.assertEqual(status.data["accounts"][0]["pages"], 2)
+        self.assertEqual(status.data["accounts"][0]["created"], 2)
+        self.assertIsNone(claim_next_job())
+
+
+    def test_stale_running_job_is_failed_and_frees_its_accounts(self, _decode):
+        job, _ = enqueue_sync_job(self.user, [self.bank_account])
+        claim_next_job()
+        long_ago = timezone.now() - timedelta(hours=1)
+        SyncJob.objects.filter(pk=job.pk).update(started_at=long_ago)
+        SyncJobAccount.objects.filter(job=job).update(updated_at=long_ago)
+
+        self.assertEqual(fail_stale_jobs(), 1)
+        requeued, created = enqueue_sync_job(self.user, [self.bank_account])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIn("stopped", job.accounts.get().last_error)
+        self.assertTrue(created)
+        self.assertNotEqual(requeued.id, job.id)
+
+    def test_inline_sync_skips_accounts_held_by_the_worker(self, _decode):
+        enqueue_sync_job(self.user, [self.bank_account])
+        claim_next_job()
+
+        with mock.patch("plaid_app.views.plaid_client") as plaid:
+            response = self.client.get("/api/plaid/get-transactions/")
+
+        plaid.transactions_sync.assert_not_called()
+        self.assertIn("already being synced", " ".join(response.data.get("warnings", [])))
+
+    def test_page_fetched_from_a_moved_cursor_is_not_applied(self, _decode):
+        class RacingClient(FakeSyncClient):
+            def transactions_sync(client, sync_request):
+                response = super().transactions_sync(sync_request)
+                # NOTE: Another sync commits the same page first
+                BankAccount.objects.filter(pk=self.bank_account.pk).update(sync_cursor="c1")
+                return response
+
+        with self.assertRaises(SyncConflict):
+            SyncEngine(RacingClient(SyncEngineAccountTest.pages)).sync_account(
+                self.user, self.bank_account
+            )
+        self.assertFalse(Transaction.objects.exists())
+
+
+@mock.patch("budgetbox_project.decorators.decode_token", return_value={"sub": "user_sync"})
+class TransactionsListTest(PlaidSyncTestCase):
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        reset_response_cache()
+        self.client = APIClient(HTTP_AUTHORIZATION="Bearer token")
+        apply_sync_page(
+            self.user,
+            self.bank_account,
+            [plaid_transaction(f"t{day}", day=day) for day in range(1, 8)],
+            [],
+            [],
+        )
+        # NOTE: Two transactions on the same day exercise the id tie-breaker
+        apply_sync_page(self.user, self.bank_account, [plaid_transaction("t7b", day=7)], [], [])
+
+    def test_keyset_pages_cover_every_transaction_once(self, _decode):
+        seen = []
+        params = {"limit": 3}
+        while True:
+            response = self.client.get("/api/plaid/transactions/", params)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(t["plaid_transaction_id"] for t in response.data["transactions"])
+            if not response.data["has_more"]:
+                break
+            params["cursor"] = response.data["next_cursor"]
+
+        self.assertEqual(seen, ["t7b", "t7", "t6", "t5", "t4", "t3", "t2", "t1"])
+
+    def test_limit_is_clamped(self, _decode):
+        smallest = self.client.get("/api/plaid/transactions/", {"limit": 0})
+        with mock.patch("plaid_app.pagination.MAX_PAGE_SIZE", 5):
+            largest = self.client.get("/api/plaid/transactions/", {"limit": 1000})
+
+        self.assertEqual((smallest.status_code, smallest.data["count"]), (200, 1))
+        self.assertEqual((largest.data["count"], largest.data["has_more"]), (5, True))
+
+    def test_invalid_cursor_is_rejected(self, _decode):
+        response = self.client.get("/api/plaid/transactions/", {"cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_category_filters_match_normalized_values(self, _decode):
+        apply_sync_page(
+            self.user,
+            self.bank_account,
+            [
+                plaid_transaction("travel", primary="TRAVEL"),
+                plaid_transaction("fee", primary="bank fees"),
+            ],
+            [],
+            [],
+        )
+
+        exact = self.client.get("/api/plaid/transactions/", {"category": "Bank Fees"})
+        many = self.client.get(
+            "/api/plaid/transactions/", {"category": "travel,bank_fees", "limit": 50}
+        )
+        prefix = self.client.get("/api/plaid/transactions/", {"category_search": "food"})
+
+        self.assertEqual([t["plaid_transaction_id"] for t in exact.data["transactions"]], ["fee"])
+        self.assertEqual(many.data["count"], 2)
+        self.assertEqual(prefix.data["count"], 8)
+
+    def test_list_output_matches_transaction_serializer(self, _decode):
+        Transaction.objects.filter(plaid_transaction_id="t1").update(
+            authorized_date=None, date_paid=None
+        )
+        expected = TransactionSerializer(
+            Transaction.objects.filter(user=self.user).order_by(*TRANSACTION_ORDERING),
+            many=True,
+        ).data
+
+        response = self.client.get("/api/plaid/transactions/", {"limit": 50})
+
+        self.assertEqual(response.data["transactions"], expected)
+
+
+@mock.patch("budgetbox_project.decorators.decode_token", return_value={"sub": "user_sync"})
+class TransactionsConditionalGetTest(PlaidSyncTestCase):
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        reset_response_cache()
+        self.client = APIClient(HTTP_AUTHORIZATION="Bearer token")
+        apply_sync_page(self.user, self.bank_account, [plaid_transaction("t1")], [], [])
+
+    def test_unchanged_list_is_not_modified_until_a_sync_changes_it(self, _decode):
+        first = self.client.get("/api/plaid/transactions/")
+        etag = first.headers["ETag"]
+
+        with self.assertNumQueries(1):
+            cached = self.client.get("/api/plaid/transactions/", HTTP_IF_NONE_MATCH=etag)
+        other_query = self.client.get(
+            "/api/plaid/transactions/", {"limit": 5}, HTTP_IF_NONE_MATCH=etag
+        )
+        apply_sync_page(self.user, self.bank_account, [], [], [{"transaction_id": "t1"}])
+        # NOTE: SyncEngine.sync_account commits last_synced with every page
+        BankAccount.objects.filter(pk=self.bank_account.pk).update(last_synced=timezone.now())
+        after_sync = self.client.get("/api/plaid/transactions/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.headers["ETag"], etag)
+        self.assertEqual(other_query.status_code, 200)
+        self.assertEqual(after_sync.status_code, 200)
+        self.assertEqual(after_sync.data["count"], 0)
+
+
+@mock.patch("budgetbox_project.decorators.decode_token", return_value={"sub": "user_sync"})
+class TransactionsResponseCacheTest(PlaidSyncTestCase):
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        reset_response_cache()
+        self.client = APIClient(HTTP_AUTHORIZATION="Bearer token")
+        apply_sync_page(self.user, self.bank_account, [plaid_transaction("t1")], [], [])
+
+    def test_edits_and_syncs_invalidate_cached_list(self, _decode):
+        self.client.get("/api/plaid/transactions/")
+        hit = self.client.get("/api/plaid/transactions/")
+
+        transaction = Transaction.objects.get(plaid_transaction_id="t1")
+        self.client.put(
+            "/api/plaid/transactions/", {"id": transaction.id, "merchant_name": "Cafe"}, format="json"
+        )
+        after_edit = self.client.get("/api/plaid/transactions/")
+        apply_sync_page(self.user, self.bank_account, [plaid_transaction("t2")], [], [])
+        after_sync = self.client.get("/api/plaid/transactions/")
+
+        self.assertEqual(hit.headers["X-Cache"], "HIT")
+        self.assertEqual(after_edit.headers["X-Cache"], "MISS")
+        self.assertEqual(after_edit.data["transactions"][0]["merchant_name"], "Cafe")
+        self.assertEqual(after_sync.data["count"], 2)
+        self.assertEqual(response_cache_stats()["hit_ratio"], 0.25)
+
+
+@mock.patch("budgetbox_project.decorators.decode_token", return_value={"sub": "user_sync"})
+class BulkApprovalTest(PlaidSyncTestCase):
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        self.client = APIClient(HTTP_AUTHORIZATION="Bearer token")
+        get_or_create_budgetbox_user("user_sync")
+        apply_sync_page(
+            self.user,
+            self.bank_account,
+            [plaid_transaction(f"t{i}", amount=10.0 + i, day=1 + i) for i in range(20)]
+            + [{**plaid_transaction("aug", amount=99.0), "authorized_date": date(2025, 8, 3)}],
+            [],
+            [],
+        )
+        self.july = Budget.objects.create(budget_box_user=self.user, date=date(2025, 7, 1))
+
+    def test_items_are_grouped_by_month_and_inserted_in_bulk(self, _decode):
+        ids = list(Transaction.objects.order_by("id").values_list("id", flat=True))
+        items = [{"transaction_id": transaction_id} for transaction_id in ids[:20]]
+        items[1]["budget_date"] = "2025-09"
+        items += [
+            {"transaction_id": ids[20], "description": "Flight"},
+            {"transaction_id": ids[-1] + 1},
+            {"transaction_id": ids[-1] + 2, "budget_date": "2025-09"},
+        ]
+
+        # NOTE: transactions + existing budgets + get_or_create per new month (2) +
+        # one bulk insert + the list version bump + one totals refresh (lock +
+        # UPDATE), plus savepoints; independent of item count
+        with self.assertNumQueries(16):
+            response = self.client.post(
+                "/api/plaid/transactions/approve/", {"transactions": items}, format="json"
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data["approved"], response.data["failed"]), (21, 2))
+        results = response.data["results"]
+        self.assertEqual([r["transaction_id"] for r in results], [item["transaction_id"] for item in items])
+        self.assertEqual(results[1]["expense_stream"]["budget_month"], "2025-09")
+        self.assertEqual(results[20]["expense_stream"]["description"], "Flight")
+        self.assertEqual(results[21]["status"], "failed")
+
+        self.july.refresh_from_db()
+        self.assertEqual(self.july.expenses.count(), 19)
+        self.assertEqual(self.july.expense_total, -sum(Decimal(10 + i) for i in range(20) if i != 1))
+        self.assertEqual(Budget.objects.get(date=date(2025, 8, 1)).expense_total, Decimal("-99.00"))
+
+    def test_invalid_payload_is_rejected_up_front(self, _decode):
+        transaction = Transaction.objects.first()
+        for items in ([], [{"transaction_id": transaction.id}] * 2, [{"transaction_id": transaction.id, "budget_date": "soon"}]):
+            response = self.client.post(
+                "/api/plaid/transactions/approve/", {"transactions": items}, format="json"
+            )
+            self.assertEqual(response.status_code, 400, items)
+        self.assertFalse(ExpenseStream.objects.exists())
+
+
+@mock.patch("budgetbox_project.decorators.decode_token", return_value={"sub": "user_sync"})
+class ApprovalLinkTest(PlaidSyncTestCase):
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        reset_response_cache()
+        self.client = APIClient(HTTP_AUTHORIZATION="Bearer token")
+        apply_sync_page(
+            self.user, self.bank_account, [plaid_transaction(f"t{i}", day=1 + i) for i in range(3)], [], []
+        )
+        self.t0, self.t1, self.t2 = Transaction.objects.order_by("id")
+
+    def listed_ids(self, approved):
+        response = self.client.get("/api/plaid/transactions/", {"approved": approved})
+        return {row["id"] for row in response.data["transactions"]}
+
+    def test_transactions_can_only_be_approved_once(self, _decode):
+        first = self.client.post("/api/plaid/transactions/", {"transaction_id": self.t0.id}, format="json")
+        again = self.client.post("/api/plaid/transactions/", {"transaction_id": self.t0.id}, format="json")
+        bulk = self.client.post(
+            "/api/plaid/transactions/approve/",
+            {"transactions": [{"transaction_id": self.t0.id}, {"transaction_id": self.t1.id}]},
+            format="json",
+        )
+
+        self.assertEqual((first.status_code, again.status_code), (201, 409))
+        self.assertEqual([r["status"] for r in bulk.data["results"]], ["failed", "approved"])
+        self.assertEqual(ExpenseStream.objects.get(transaction=self.t1).amount, Decimal("-10.00"))
+
+        only_failures = self.client.post(
+            "/api/plaid/transactions/approve/", {"transactions": [{"transaction_id": self.t0.id}]}, format="json"
+        )
+        self.assertEqual((only_failures.status_code, only_failures.data["failed"]), (200, 1))
+
+    def test_long_merchant_names_are_truncated_on_both_approval_paths(self, _decode):
+        Transaction.objects.filter(id__in=[self.t0.id, self.t1.id]).update(merchant_name="M" * 255)
+
+        single = self.client.post("/api/plaid/transactions/", {"transaction_id": self.t0.id}, format="json")
+        bulk = self.client.post(
+            "/api/plaid/transactions/approve/", {"transactions": [{"transaction_id": self.t1.id}]}, format="json"
+        )
+
+        self.assertEqual(single.data["expense_stream"]["merchant_name"], "M" * 100)
+        self.assertEqual(bulk.data["results"][0]["expense_stream"]["merchant_name"], "M" * 100)
+
+    def test_list_filters_on_approval_and_follows_changes(self, _decode):
+        self.assertEqual(self.listed_ids("false"), {self.t0.id, self.t1.id, self.t2.id})
+        stale = self.client.get("/api/plaid/transactions/", {"approved": "false"})
+
+        self.client.post("/api/plaid/transactions/", {"transaction_id": self.t1.id}, format="json")
+        revalidated = self.client.get(
+            "/api/plaid/transactions/", {"approved": "false"}, HTTP_IF_NONE_MATCH=stale["ETag"]
+        )
+        self.assertEqual(revalidated.status_code, 200)
+        self.assertEqual(self.listed_ids("false"), {self.t0.id, self.t2.id})
+        self.assertEqual(self.listed_ids("true"), {self.t1.id})
+
+        approved = self.client.get("/api/plaid/transactions/", {"approved": "true"})
+        # NOTE: Un-approving bumps the list version, so the ETag changes even where
+        # the cache invalidation doesn't reach (another process)
+        with mock.patch("entries.signals.invalidate_user_cache"):
+            ExpenseStream.objects.get(transaction=self.t1).delete()
+        revalidated = self.client.get(
+            "/api/plaid/transactions/", {"approved": "true"}, HTTP_IF_NONE_MATCH=approved["ETag"]
+        )
+        self.assertEqual(revalidated.status_code, 200)
+        self.assertEqual(revalidated.data["transactions"], [])
+        self.assertEqual(self.listed_ids("true"), set())
+        self.assertEqual(self.client.get("/api/plaid/transactions/", {"approved": "maybe"}).status_code, 400)
+
+    def test_deleting_a_transaction_keeps_its_expense(self, _decode):
+        self.client.post("/api/plaid/transactions/", {"transaction_id": self.t2.id}, format="json")
+        self.client.delete("/api/plaid/transactions/", {"id": self.t2.id}, format="json")
+
+        self.assertIsNone(ExpenseStream.objects.get().transaction_id)
+
+    def test_removing_an_approved_transaction_changes_its_budget(self, _decode):
+        self.client.post("/api/plaid/transactions/", {"transaction_id": self.t1.id}, format="json")
+        self.client.post("/api/plaid/transactions/", {"transaction_id": self.t2.id}, format="json")
+        params = {"date": "2025-07"}
+
+        for remove in (
+            lambda: self.client.delete("/api/plaid/transactions/", {"id": self.t1.id}, format="json"),
+            lambda: apply_sync_page(self.user, self.bank_account, [], [], [{"transaction_id": "t2"}]),
+        ):
+            before = self.client.get("/api/entries/budget/", params)
+            remove()
+            after = self.client.get("/api/entries/budget/", params, HTTP_IF_NONE_MATCH=before["ETag"])
+
+            self.assertEqual(after.status_code, 200)
+            self.assertEqual(after.headers["X-Cache"], "MISS")
+            self.assertNotEqual(after["ETag"], before["ETag"])
+        self.assertEqual([row["transaction"] for row in after.data["expenses"]], [None, None])
+
+
+@mock.patch("budgetbox_project.decorators.decode_token", return_value={"sub": "user_sync"})
+class PlaidQueryBudgetTest(PlaidSyncTestCase):
+    """
+    Query-count budgets per endpoint. Sizes are chosen so an N+1 regression
+    blows the budget; raise a budget only together with the reason why.
+    """
+
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        reset_response_cache()
+        self.client = APIClient(HTTP_AUTHORIZATION="Bearer token")
+        apply_sync_page(
+            self.user,
+            self.bank_account,
+            [plaid_transaction(f"t{i}", day=1 + i % 28) for i in range(50)],
+            [],
+            [],
+        )
+        # NOTE: Resolve the user once so the budgets below measure the endpoint itself
+        get_or_create_budgetbox_user("user_sync")
+
+    def assertQueryBudget(self, budget, method, url, data=None):
+        with self.assertNumQueries(budget):
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertLess(response.status_code, 400, response.data)
+        return response
+
+    def test_transactions_list(self, _decode):
+        # NOTE: conditional GET validators + the page itself
+        response = self.assertQueryBudget(
+            2, "get", "/api/plaid/transactions/", {"limit": 50}
+        )
+        self.assertEqual(response.data["count"], 50)
+        self.assertEqual(response.data["transactions"][0]["bank_account_name"], "Checking")
+
+    def test_transactions_update(self, _decode):
+        transaction = Transaction.objects.first()
+        # NOTE: lookup + update + the list version bump
+        self.assertQueryBudget(
+            3, "put", "/api/plaid/transactions/", {"id": transaction.id, "merchant_name": "Cafe"}
+        )
+
+
+class PlaidClientRetryTest(SimpleTestCase):
+    def make_client(self, api):
+        self.sleeps = []
+        return PlaidClient(api, max_retries=3, backoff=0.5, backoff_max=4, sleep=self.sleeps.append)
+
+    def test_rate_limits_and_server_errors_are_retried_with_capped_backoff(self):
+        api = mock.Mock()
+        api.transactions_sync.side_effect = [
+            plaid.ApiException(status=429),
+            plaid.ApiException(status=503),
+            {"has_more": False},
+        ]
+        client = self.make_client(api)
+
+        response = client.transactions_sync("request")
+
+        self.assertEqual(response, {"has_more": False})
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertLessEqual(self.sleeps[0], 0.5)
+        self.assertLessEqual(self.sleeps[1], 1.0)
+        api.transactions_sync.assert_called_with("request", _request_timeout=client.timeout)
+        metrics = client.metrics.as_dict()["transactions_sync"]
+        self.assertEqual((metrics["count"], metrics["errors"], metrics["retries"]), (3, 2, 2))
+
+    def test_client_errors_and_non_idempotent_server_errors_are_not_retried(self):
+        api = mock.Mock()
+        api.accounts_get.side_effect = plaid.ApiException(status=400)
+        api.item_public_token_exchange.side_effect = plaid.ApiException(status=500)
+        client = self.make_client(api)
+
+        with self.assertRaises(plaid.ApiException):
+            client.accounts_get("request")
+        with self.assertRaises(plaid.ApiException):
+            client.item_public_token_exchange("request")
+
+        self.assertEqual(self.sleeps, [])
+
+    def test_gives_up_after_max_retries(self):
+        api = mock.Mock()
+        api.transactions_sync.side_effect = plaid.ApiException(status=500)
+        client = self.make_client(api)
+
+        with self.assertRaises(plaid.ApiException):
+            client.transactions_sync("request")
+
+        self.assertEqual(api.transactions_sync.call_count, 4)
+
+
+@mock.patch("budgetbox_project.decorators.decode_token", return_value={"sub": "user_fake"})
+class FakePlaidEndToEndTest(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        reset_response_cache()
+        self.client = APIClient(HTTP_AUTHORIZATION="Bearer token")
+
+    def start_fake(self, **config):
+        backend = FakePlaidBackend(FakePlaidConfig(**config))
+        server = FakePlaidServer(backend).start()
+        self.addCleanup(server.stop)
+        plaid = create_plaid_client(
+            environment=server.url, client_id="fake", secret="fake", sleep=lambda seconds: None
+        )
+        patcher = mock.patch("plaid_app.views.plaid_client", plaid)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return backend, plaid
+
+    def assert_matches_fake(self, item):
+        stored = dict(Transaction.objects.values_list("plaid_transaction_id", "amount"))
+        expected = {
+            transaction_id: Decimal(str(transaction["amount"]))
+            for transaction_id, transaction in item.live.items()
+        }
+        self.assertEqual(stored, expected)
+
+        rollups = MonthlyCategoryRollup.objects.filter(count__gt=0).values_list(
+            "user_id", "month", "category", "total", "count"
+        )
+        incremental = set(rollups)
+        rebuild_rollups()
+        self.assertEqual(set(rollups), incremental)
+
+    def test_link_sync_and_refresh_against_fake_plaid(self, _decode):
+        backend, _ = self.start_fake(history_size=600, round_size=30, seed=7)
+
+        link = self.client.post("/api/plaid/create-link-token/")
+        self.assertTrue(link.data["link_token"].startswith("link-fake-"))
+        exchange = self.client.post(
+            "/api/plaid/exchange-public-token/", {"public_token": "public-1"}, format="json"
+        )
+        self.assertEqual(exchange.data["total_new"], 1)
+        (item,) = backend.items.values()
+
+        response = self.client.get("/api/plaid/get-transactions/")
+        self.assertNotIn("warnings", response.data)
+        self.assert_matches_fake(item)
+        # NOTE: 630 events at the default page size of 500 take two pages
+        self.assertEqual(backend.calls["transactions_sync"], 2)
+
+        response = self.client.get("/api/plaid/refresh-transactions/")
+        self.assertNotIn("warnings", response.data)
+        self.assertEqual(backend.calls["transactions_refresh"], 1)
+        self.assert_matches_fake(item)
+
+    def test_injected_errors_are_retried_until_sync_completes(self, _decode):
+        backend, plaid = self.start_fake(
+            history_size=200, error_rate=0.5, error_operations=("transactions_sync",), seed=3
+        )
+        self.client.post(
+            "/api/plaid/exchange-public-token/", {"public_token": "public-1"}, format="json"
+        )
+        (item,) = backend.items.values()
+        user = get_user_model().objects.get(clerk_user_id="user_fake")
+
+        outcomes = SyncEngine(plaid, page_size=25).sync_accounts(user, user.bank_accounts.all())
+
+        self.assertIsNone(outcomes[0].error)
+        self.assertEqual(outcomes[0].result.pages, 10)
+        self.assertGreater(plaid.metrics.as_dict()["transactions_sync"]["retries"], 0)
+        self.assert_matches_fake(item)
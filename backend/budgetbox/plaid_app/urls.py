@@ -1,10 +1,13 @@
 from django.urls import path
 
 from .views import (
+    ApproveTransactions,
     CreateLinkToken,
     ExchangePublicToken,
     GetTransactions,
+    PlaidClientStats,
     RefreshTransactions,
+    SyncJobStatus,
     Transactions,
     UnlinkBankAccount,
 )
@@ -20,11 +23,22 @@ urlpatterns = [
     path(
         "transactions/", Transactions.as_view(), name="transactions"
     ),
+    path(
+        "transactions/approve/",
+        ApproveTransactions.as_view(),
+        name="approve_transactions",
+    ),
     path(
         "refresh-transactions/",
         RefreshTransactions.as_view(),
         name="refresh_transactions",
     ),
+    path(
+        "sync-jobs/<int:job_id>/",
+        SyncJobStatus.as_view(),
+        name="sync_job_status",
+    ),
+    path("client-stats/", PlaidClientStats.as_view(), name="plaid_client_stats"),
     path(
         "unlink-bank-account/",
         UnlinkBankAccount.as_view(),
@@ -1,11 +1,16 @@
-import plaid
-from budgetbox_project.decorators import clerk_auth_required
-from budgetbox_project.settings import PLAID_CLIENT_ID, PLAID_SANDBOX_KEY
-from clerk_app.models import BudgetBoxUser
+from contextlib import nullcontext
+
+from budgetbox_project.decorators import clerk_auth_required, conditional_get
+from budgetbox_project.response_cache import (BUDGET_SCOPE,
+                                              TRANSACTIONS_SCOPE,
+                                              cached_response,
+                                              invalidate_user_cache)
 from django.contrib.auth import get_user_model
-from django.utils import timezone
-from entries.models import Budget, ExpenseStream
-from plaid.api import plaid_api
+from django.db import IntegrityError
+from django.db import transaction as db_transaction
+from django.db.models import Exists, Max, OuterRef
+from entries.models import (Budget, ExpenseStream, bump_linked_budget_versions,
+                            get_or_create_month_budgets, refresh_budget_totals)
 from plaid.model.accounts_get_request import AccountsGetRequest
 from plaid.model.country_code import CountryCode
 from plaid.model.item_public_token_exchange_request import \
@@ -14,31 +19,158 @@ from plaid.model.link_token_create_request import LinkTokenCreateRequest
 from plaid.model.link_token_create_request_user import \
     LinkTokenCreateRequestUser
 from plaid.model.products import Products
-from plaid.model.transactions_refresh_request import TransactionsRefreshRequest
-from plaid.model.transactions_sync_request import TransactionsSyncRequest
 from plaid.model.item_remove_request import ItemRemoveRequest
 from rest_framework import status as s
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import (BankAccount, Transaction, create_bank_account_from_plaid,
-                     create_transaction_from_plaid,
-                     delete_transaction_from_plaid,
-                     update_transaction_from_plaid)
-from .serializers import (TransactionApprovalSerializer, TransactionSerializer,
-                          TransactionUpdateSerializer)
+from .client import plaid_client
+from .jobs import (enqueue_sync_job, fail_sync_job, run_sync_job,
+                   start_inline_sync_job)
+from .models import (BankAccount, SyncJob, Transaction,
+                     bump_transaction_list_version,
+                     create_bank_account_from_plaid, normalize_category)
+from .pagination import (TRANSACTION_ORDERING, encode_transaction_cursor,
+                         page_size, transactions_after)
+from .rollups import ROLLUP_FIELDS, RollupDeltas, apply_rollup_deltas
+from .serializers import (BulkTransactionApprovalSerializer,
+                          SyncJobSerializer, TransactionApprovalSerializer,
+                          TransactionSerializer, TransactionUpdateSerializer,
+                          transaction_reader)
 
 User = get_user_model()
 
-configuration = plaid.Configuration(
-    host=plaid.Environment.Sandbox,
-    api_key={
-        "clientId": PLAID_CLIENT_ID,
-        "secret": PLAID_SANDBOX_KEY,
-    },
-)
-api_client = plaid.ApiClient(configuration)
-plaid_client = plaid_api.PlaidApi(api_client)
+
+def _wants_background(request):
+    return str(request.query_params.get("background", "")).lower() in ("1", "true", "yes")
+
+
+def _approved_filter(raw):
+    """Parse the `approved` list filter: True, False or None when absent."""
+    if raw is None or raw == "":
+        return None
+    value = str(raw).lower()
+    if value in ("1", "true", "yes"):
+        return True
+    if value in ("0", "false", "no"):
+        return False
+    raise ValueError("approved must be true or false")
+
+
+_STREAM_MERCHANT_MAX_LENGTH = ExpenseStream._meta.get_field("merchant_name").max_length
+
+
+def _approvals():
+    # NOTE: Correlated EXISTS on the unique ExpenseStream.transaction index; negated,
+    # it's an anti-join that never reads the expense streams themselves
+    return ExpenseStream.objects.filter(transaction=OuterRef("pk"))
+
+
+def _enqueue_sync_response(user, bank_accounts, refresh=False):
+    """Queue a sync for the worker and return its job id straight away (202)."""
+    job, created = enqueue_sync_job(user, bank_accounts, refresh=refresh)
+    if job is None:
+        return Response(
+            {"error": "No bank account with an access token to sync."},
+            status=s.HTTP_400_BAD_REQUEST,
+        )
+    data = SyncJobSerializer(job).data
+    data["message"] = "Sync queued" if created else "Sync already in progress"
+    return Response(data, status=s.HTTP_202_ACCEPTED)
+
+
+def _sync_now(user, bank_accounts, refresh=False):
+    """
+    Run the sync inline for a request. Returns the newly created transactions as
+    response dicts plus one warning per account that failed or was skipped.
+
+    The accounts are claimed through a SyncJob like background syncs, so an
+    account already syncing in the worker (or another request) is skipped.
+    """
+    created_transactions = []
+
+    def collect_created(bank_account, page):
+        created_transactions.extend(
+            _synced_transaction_data(transaction, bank_account)
+            for transaction in page.created
+        )
+
+    job, busy = start_inline_sync_job(user, bank_accounts, refresh=refresh)
+    errors = [
+        f"{bank_account.account_name} is already being synced; skipped"
+        for bank_account in busy
+    ]
+    if job is None:
+        return created_transactions, errors
+    try:
+        outcomes = run_sync_job(job, client=plaid_client, on_page=collect_created)
+    except Exception as e:
+        fail_sync_job(job, e)
+        raise
+
+    action = "refreshing" if refresh else "syncing"
+    errors += [
+        f"Error {action} {outcome.bank_account.account_name}: {str(outcome.error)}"
+        for outcome in outcomes
+        if outcome.error is not None
+    ]
+    return created_transactions, errors
+
+
+def _transactions_validators(request):
+    # NOTE: One row per linked account plus the user's TransactionListVersion:
+    # last_synced moves with every committed sync page, and edits, deletions,
+    # unlinks and (un)approvals bump the version
+    user = request.budgetbox_user
+    stats = (
+        User.objects.filter(pk=user.pk)
+        .annotate(synced=Max('bank_accounts__last_synced'))
+        .values('synced', 'transaction_list_version__version', 'transaction_list_version__updated_at')
+        .first()
+    )
+    synced = stats['synced']
+    changes = stats['transaction_list_version__version'] or 0
+    changed_at = stats['transaction_list_version__updated_at']
+    last_modified = max(filter(None, [synced, changed_at]), default=None)
+    return f"transactions:{user.id}:{changes}:{synced}", last_modified
+
+
+def _synced_transaction_data(transaction, bank_account):
+    return {
+        "id": transaction.id,
+        "merchant_name": transaction.merchant_name,
+        "amount": str(transaction.amount),
+        "authorized_date": str(transaction.authorized_date),
+        "date_paid": str(transaction.date_paid) if transaction.date_paid else None,
+        "category": transaction.category,
+        "account": bank_account.account_name,
+    }
+
+
+def _expense_for_transaction(transaction, budget, description=None):
+    """The (unsaved) expense stream approving `transaction` into `budget`."""
+    # NOTE: Bank merchant names can be longer than the stream column
+    merchant_name = transaction.merchant_name[:_STREAM_MERCHANT_MAX_LENGTH]
+    return ExpenseStream(
+        budget=budget,
+        merchant_name=merchant_name,
+        description=description or merchant_name,
+        amount=-abs(transaction.amount),
+        category=transaction.category,
+        transaction=transaction,
+    )
+
+
+def _approved_expense_data(expense_stream, budget):
+    return {
+        "id": expense_stream.id,
+        "merchant_name": expense_stream.merchant_name,
+        "description": expense_stream.description,
+        "amount": str(expense_stream.amount),
+        "category": expense_stream.category,
+        "budget_month": budget.date.strftime('%Y-%m'),
+        "budget_id": budget.id,
+    }
 
 
 class CreateLinkToken(APIView):
@@ -46,12 +178,7 @@ class CreateLinkToken(APIView):
     @clerk_auth_required
     def post(self, request):
         try:
-            user, created = User.objects.get_or_create(
-                clerk_user_id=request.clerk_user_id,
-                defaults={
-                    "email": f"{request.clerk_user_id}@example.com"
-                },
-            )
+            user = request.budgetbox_user
 
             link_request = LinkTokenCreateRequest(
                 products=[Products("transactions")],
@@ -94,7 +221,7 @@ class ExchangePublicToken(APIView):
 
             institution_name = accounts_response.get('item', {}).get('institution_name', 'Unknown Bank')
 
-            user = User.objects.get(clerk_user_id=request.clerk_user_id)
+            user = request.budgetbox_user
 
             created_accounts = []
             existing_accounts = []
@@ -143,7 +270,7 @@ class GetTransactions(APIView):
     @clerk_auth_required
     def get(self, request):
         try:
-            user = BudgetBoxUser.objects.get(clerk_user_id=request.clerk_user_id)
+            user = request.budgetbox_user
             bank_accounts = user.bank_accounts.filter(is_active=True)
 
             if not bank_accounts.exists():
@@ -152,114 +279,92 @@ class GetTransactions(APIView):
                     status=400
                 )
 
-            all_created_transactions = []
-
-            for bank_account in bank_accounts:
-                if not bank_account.plaid_access_token:
-                    continue
-
-                try:
-                    cursor = bank_account.sync_cursor or ""
-                    
-                    added = []
-                    modified = []
-                    removed = []
-                    has_more = True
-
-                    while has_more:
-                        sync_request = TransactionsSyncRequest(
-                            access_token=bank_account.plaid_access_token,
-                            cursor=cursor,
-                            count=500
-                        )
-                        
-                        response = plaid_client.transactions_sync(sync_request)
-                        
-                        added.extend(response.get('added', []))
-                        modified.extend(response.get('modified', []))
-                        removed.extend(response.get('removed', []))
-                        
-                        has_more = response.get('has_more', False)
-                        cursor = response.get('next_cursor')
-                    
-                    for transaction_data in added:
-                        transaction, created = create_transaction_from_plaid(
-                            user, bank_account, transaction_data
-                        )
-                        
-                        if created:
-                            all_created_transactions.append({
-                                "id": transaction.id,
-                                "merchant_name": transaction.merchant_name,
-                                "amount": str(transaction.amount),
-                                "authorized_date": str(transaction.authorized_date),
-                                "date_paid": str(transaction.date_paid) if transaction.date_paid else None,
-                                "category": transaction.category,
-                                "account": bank_account.account_name,
-                            })
-
-                    for transaction_data in modified:
-                        existing_transaction = Transaction.objects.filter(
-                            plaid_transaction_id=transaction_data['transaction_id']
-                        ).first()
-                        
-                        if existing_transaction:
-                            update_transaction_from_plaid(existing_transaction, transaction_data)
-
-                    for removed_data in removed:
-                        delete_transaction_from_plaid(removed_data['transaction_id'])
-
-                    bank_account.sync_cursor = cursor
-                    bank_account.last_synced = timezone.now()
-                    bank_account.save()
+            if _wants_background(request):
+                return _enqueue_sync_response(user, bank_accounts)
 
-                except Exception as account_error:
-                    continue
+            all_created_transactions, sync_errors = _sync_now(user, bank_accounts)
 
-            return Response({
+            response_data = {
                 "message": f"Created {len(all_created_transactions)} new transactions",
                 "transactions": all_created_transactions,
-            })
+            }
+
+            if sync_errors:
+                response_data["warnings"] = sync_errors
+
+            return Response(response_data)
 
         except Exception as e:
             return Response({"error": str(e)}, status=400)
 
 class Transactions(APIView):
     @clerk_auth_required
+    @conditional_get(_transactions_validators)
+    @cached_response(TRANSACTIONS_SCOPE)
     def get(self, request):
         try:
-            user = User.objects.get(clerk_user_id=request.clerk_user_id)
-            
-            limit = int(request.query_params.get('limit', 10))
-            category = request.query_params.get('category')
+            user = request.budgetbox_user
+            
+            limit = page_size(request.query_params.get('limit'))
+            # NOTE: `category` matches exactly and accepts a comma-separated list;
+            # `category_search` is a prefix search over the normalized names
+            categories = [
+                normalize_category(value)
+                for value in request.query_params.get('category', '').split(',')
+                if value.strip()
+            ]
+            category_search = request.query_params.get('category_search')
+            approved = _approved_filter(request.query_params.get('approved'))
             date_from = request.query_params.get('date_from')
             date_to = request.query_params.get('date_to')
+            cursor = request.query_params.get('cursor')
             
-            transactions = user.transactions.all()
+            transactions = user.transactions.order_by(*TRANSACTION_ORDERING)
             
-            if category:
-                transactions = transactions.filter(category__icontains=category)
+            if len(categories) == 1:
+                transactions = transactions.filter(category=categories[0])
+            elif categories:
+                transactions = transactions.filter(category__in=categories)
+
+            if category_search and category_search.strip():
+                transactions = transactions.filter(
+                    category__startswith=normalize_category(category_search)
+                )
             
+            if approved is not None:
+                transactions = transactions.filter(
+                    Exists(_approvals()) if approved else ~Exists(_approvals())
+                )
+
             if date_from:
                 transactions = transactions.filter(authorized_date__gte=date_from)
             
             if date_to:
                 transactions = transactions.filter(authorized_date__lte=date_to)
+
+            if cursor:
+                transactions = transactions_after(transactions, cursor)
             
-            transactions = transactions[:limit]
+            # NOTE: Fetch one extra row to know whether another page exists. Rows are
+            # read with values_list (bank account names joined in the same query)
+            # and serialized without building model instances.
+            rows = list(transactions.values_list(*transaction_reader.lookups)[:limit + 1])
+            has_more = len(rows) > limit
+            data = transaction_reader.serialize_rows(rows[:limit])
             
-            serializer = TransactionSerializer(transactions, many=True)
+            next_cursor = None
+            if has_more:
+                next_cursor = encode_transaction_cursor(
+                    data[-1]["authorized_date"], data[-1]["id"]
+                )
             
             return Response({
-                "transactions": serializer.data,
-                "count": len(serializer.data)
+                "transactions": data,
+                "count": len(data),
+                "has_more": has_more,
+                "next_cursor": next_cursor,
             })
             
-        except User.DoesNotExist:
-            return Response(
-                {"error": "User not found"}, 
-                status=s.HTTP_404_NOT_FOUND
-            )
         except Exception as e:
             return Response(
                 {"error": str(e)}, 
@@ -269,7 +374,7 @@ class Transactions(APIView):
     @clerk_auth_required
     def post(self, request):
         try:
-            user = User.objects.get(clerk_user_id=request.clerk_user_id)
+            user = request.budgetbox_user
             
             serializer = TransactionApprovalSerializer(data=request.data)
             if not serializer.is_valid():
@@ -283,12 +388,20 @@ class Transactions(APIView):
             description = validated_data.get('description', '')
             
             try:
-                transaction = Transaction.objects.get(id=transaction_id, user=user)
+                transaction = Transaction.objects.annotate(
+                    approved=Exists(_approvals())
+                ).get(id=transaction_id, user=user)
             except Transaction.DoesNotExist:
                 return Response(
                     {"error": "Transaction not found or access denied"}, 
                     status=s.HTTP_404_NOT_FOUND
                 )
+
+            if transaction.approved:
+                return Response(
+                    {"error": "Transaction has already been approved"},
+                    status=s.HTTP_409_CONFLICT
+                )
             
             transaction_date = transaction.authorized_date or transaction.date_paid
             if not transaction_date:
@@ -322,27 +435,21 @@ class Transactions(APIView):
                 budget_date = transaction_date.replace(day=1)
                 budget, _ = Budget.objects.get_or_create(budget_box_user=user, date=budget_date)
             
-            expense_amount = -abs(transaction.amount)
-            
-            expense_stream = ExpenseStream.objects.create(
-                budget=budget,
-                merchant_name=transaction.merchant_name,
-                description=description if description else transaction.merchant_name,
-                amount=expense_amount,
-                category=transaction.category,
-            )
+            try:
+                with db_transaction.atomic():
+                    expense_stream = _expense_for_transaction(transaction, budget, description)
+                    expense_stream.save()
+                    bump_transaction_list_version(user.id)
+            except IntegrityError:
+                # NOTE: A concurrent request approved it after the check above
+                return Response(
+                    {"error": "Transaction has already been approved"},
+                    status=s.HTTP_409_CONFLICT
+                )
             
             return Response({
                 "message": "Transaction approved and added to budget successfully",
-                "expense_stream": {
-                    "id": expense_stream.id,
-                    "merchant_name": expense_stream.merchant_name,
-                    "description": expense_stream.description,
-                    "amount": str(expense_stream.amount),
-                    "category": expense_stream.category,
-                    "budget_month": budget.date.strftime('%Y-%m'),
-                    "budget_id": budget.id,
-                },
+                "expense_stream": _approved_expense_data(expense_stream, budget),
                 "original_transaction": {
                     "id": transaction.id,
                     "merchant_name": transaction.merchant_name,
@@ -351,11 +458,6 @@ class Transactions(APIView):
                 }
             }, status=s.HTTP_201_CREATED)
             
-        except User.DoesNotExist:
-            return Response(
-                {"error": "User not found"}, 
-                status=s.HTTP_404_NOT_FOUND
-            )
         except Exception as e:
             return Response(
                 {"error": str(e)}, 
@@ -365,7 +467,7 @@ class Transactions(APIView):
     @clerk_auth_required
     def put(self, request):
         try:
-            user = User.objects.get(clerk_user_id=request.clerk_user_id)
+            user = request.budgetbox_user
             transaction_id = request.data.get('id')
             
             if not transaction_id:
@@ -375,7 +477,9 @@ class Transactions(APIView):
                 )
             
             try:
-                transaction = Transaction.objects.get(id=transaction_id, user=user)
+                transaction = Transaction.objects.select_related('bank_account').get(
+                    id=transaction_id, user=user
+                )
             except Transaction.DoesNotExist:
                 return Response(
                     {"error": "Transaction not found or access denied"}, 
@@ -389,7 +493,17 @@ class Transactions(APIView):
                     status=s.HTTP_400_BAD_REQUEST
                 )
             
-            updated_transaction = serializer.save()
+            # NOTE: Only date and category edits move the amount between rollups
+            deltas = RollupDeltas()
+            deltas.remove_transaction(transaction)
+            rollup_changed = ROLLUP_FIELDS & serializer.validated_data.keys()
+            with db_transaction.atomic() if rollup_changed else nullcontext():
+                updated_transaction = serializer.save()
+                bump_transaction_list_version(user.id)
+                if rollup_changed:
+                    deltas.add_transaction(updated_transaction)
+                    apply_rollup_deltas(user.id, deltas)
+            invalidate_user_cache(user.id, TRANSACTIONS_SCOPE)
             
             response_serializer = TransactionSerializer(updated_transaction)
             return Response({
@@ -397,11 +511,6 @@ class Transactions(APIView):
                 "transaction": response_serializer.data
             })
             
-        except User.DoesNotExist:
-            return Response(
-                {"error": "User not found"}, 
-                status=s.HTTP_404_NOT_FOUND
-            )
         except Exception as e:
             return Response(
                 {"error": str(e)}, 
@@ -411,7 +520,7 @@ class Transactions(APIView):
     @clerk_auth_required
     def delete(self, request):
         try:
-            user = User.objects.get(clerk_user_id=request.clerk_user_id)
+            user = request.budgetbox_user
             transaction_id = request.data.get('id')
             
             if not transaction_id:
@@ -434,29 +543,127 @@ class Transactions(APIView):
                 "amount": str(transaction.amount)
             }
             
-            transaction.delete()
+            deltas = RollupDeltas()
+            deltas.remove_transaction(transaction)
+            scopes = [TRANSACTIONS_SCOPE]
+            with db_transaction.atomic():
+                # NOTE: Deleting an approved transaction unlinks its expense
+                if bump_linked_budget_versions(Transaction.objects.filter(pk=transaction.pk)):
+                    scopes.append(BUDGET_SCOPE)
+                transaction.delete()
+                apply_rollup_deltas(user.id, deltas)
+                bump_transaction_list_version(user.id)
+            invalidate_user_cache(user.id, *scopes)
             
             return Response({
                 "message": "Transaction deleted successfully",
                 "deleted_transaction": transaction_info
             }, status=s.HTTP_204_NO_CONTENT)
             
-        except User.DoesNotExist:
-            return Response(
-                {"error": "User not found"}, 
-                status=s.HTTP_404_NOT_FOUND
-            )
         except Exception as e:
             return Response(
                 {"error": str(e)}, 
                 status=s.HTTP_400_BAD_REQUEST
             )
 
+class ApproveTransactions(APIView):
+    @clerk_auth_required
+    def post(self, request):
+        """
+        Approve many transactions at once.
+        Payload: {"transactions": [{"transaction_id", "description"?, "budget_date"?}, ...]}
+        Items are grouped by target month (the transaction's month unless
+        `budget_date` is given), each month's budget is resolved once and all
+        expense streams are inserted with one bulk_create in a single database
+        transaction. Returns one result per item, in request order.
+        """
+        user = request.budgetbox_user
+
+        serializer = BulkTransactionApprovalSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=s.HTTP_400_BAD_REQUEST)
+        items = serializer.validated_data["transactions"]
+
+        transactions = (
+            Transaction.objects.filter(user=user)
+            .only("id", "merchant_name", "amount", "category", "authorized_date", "date_paid")
+            .annotate(approved=Exists(_approvals()))
+            .in_bulk([item["transaction_id"] for item in items])
+        )
+
+        results = {}
+        approvals = []
+        for item in items:
+            transaction_id = item["transaction_id"]
+            transaction = transactions.get(transaction_id)
+            if transaction is None:
+                results[transaction_id] = "Transaction not found or access denied"
+                continue
+            if transaction.approved:
+                results[transaction_id] = "Transaction has already been approved"
+                continue
+            transaction_date = transaction.authorized_date or transaction.date_paid
+            month = item.get("budget_date") or (transaction_date and transaction_date.replace(day=1))
+            if not month:
+                results[transaction_id] = "Transaction has no valid date"
+                continue
+            approvals.append((item, transaction, month))
+
+        if approvals:
+            try:
+                streams = self._create_streams(user, approvals)
+            except IntegrityError:
+                # NOTE: Another request approved some of these after the check above
+                return Response(
+                    {"error": "Some of these transactions were approved concurrently; retry the request"},
+                    status=s.HTTP_409_CONFLICT,
+                )
+            for (item, _, _), stream in zip(approvals, streams):
+                results[item["transaction_id"]] = _approved_expense_data(stream, stream.budget)
+
+        data = []
+        for item in items:
+            transaction_id = item["transaction_id"]
+            result = results[transaction_id]
+            if isinstance(result, str):
+                data.append({"transaction_id": transaction_id, "status": "failed", "error": result})
+            else:
+                data.append(
+                    {"transaction_id": transaction_id, "status": "approved", "expense_stream": result}
+                )
+        return Response(
+            {
+                "message": f"Approved {len(approvals)} of {len(items)} transactions",
+                "results": data,
+                "approved": len(approvals),
+                "failed": len(items) - len(approvals),
+            },
+            # NOTE: Per-item failures are reported in `results`; the request itself
+            # was valid, so it succeeds even when nothing could be approved
+            status=s.HTTP_201_CREATED if approvals else s.HTTP_200_OK,
+        )
+
+    def _create_streams(self, user, approvals):
+        with db_transaction.atomic():
+            budgets = get_or_create_month_budgets(user, {month for _, _, month in approvals})
+            streams = [
+                _expense_for_transaction(transaction, budgets[month], item.get("description"))
+                for item, transaction, month in approvals
+            ]
+            ExpenseStream.objects.bulk_create(streams)
+            bump_transaction_list_version(user.id)
+            # NOTE: bulk_create skips the stream signals, so totals and cached
+            # budget and transaction responses are refreshed here
+            refresh_budget_totals({budget.id for budget in budgets.values()})
+            invalidate_user_cache(user.id, BUDGET_SCOPE, TRANSACTIONS_SCOPE)
+        return streams
+
+
 class RefreshTransactions(APIView):
     @clerk_auth_required
     def get(self, request):
         try:
-            user = User.objects.get(clerk_user_id=request.clerk_user_id)
+            user = request.budgetbox_user
 
             bank_accounts = user.bank_accounts.filter(is_active=True)
 
@@ -465,86 +672,15 @@ class RefreshTransactions(APIView):
                     {"error": "No bank account linked. Please link an account first."}, 
                     status=s.HTTP_400_BAD_REQUEST
                 )
-            
-            all_new_transactions = []
-            refresh_errors = []
-
-            for bank_account in bank_accounts:
-                if not bank_account.plaid_access_token:
-                    continue
-
-                try:
-                    refresh_request = TransactionsRefreshRequest(
-                        access_token=bank_account.plaid_access_token
-                    )
-                    plaid_client.transactions_refresh(refresh_request)
-                    
-                    cursor = bank_account.sync_cursor or ""
-                    
-                    added = []
-                    modified = []
-                    removed = []
-                    has_more = True
-                    page_count = 0
-
-                    while has_more:
-                        page_count += 1
-                        
-                        sync_request = TransactionsSyncRequest(
-                            access_token=bank_account.plaid_access_token,
-                            cursor=cursor,
-                            count=500
-                        )
-                        
-                        response = plaid_client.transactions_sync(sync_request)
-                        
-                        page_added = response.get('added', [])
-                        page_modified = response.get('modified', [])
-                        page_removed = response.get('removed', [])
-                        
-                        added.extend(page_added)
-                        modified.extend(page_modified)
-                        removed.extend(page_removed)
-                        
-                        has_more = response.get('has_more', False)
-                        cursor = response.get('next_cursor')
-
-                    for i, transaction_data in enumerate(added, 1):
-                        transaction, created = create_transaction_from_plaid(
-                            user, bank_account, transaction_data
-                        )
-                        
-                        if created:
-                            all_new_transactions.append({
-                                "id": transaction.id,
-                                "merchant_name": transaction.merchant_name,
-                                "amount": str(transaction.amount),
-                                "authorized_date": str(transaction.authorized_date),
-                                "date_paid": str(transaction.date_paid) if transaction.date_paid else None,
-                                "category": transaction.category,
-                                "account": bank_account.account_name,
-                                "is_new": True
-                            })
-
-                    for i, transaction_data in enumerate(modified, 1):
-                        existing_transaction = Transaction.objects.filter(
-                            plaid_transaction_id=transaction_data['transaction_id']
-                        ).first()
-                        
-                        if existing_transaction:
-                            update_transaction_from_plaid(existing_transaction, transaction_data)
-
-                    for i, removed_data in enumerate(removed, 1):
-                        delete_transaction_from_plaid(removed_data['transaction_id'])
-
-                    bank_account.sync_cursor = cursor
-                    bank_account.last_synced = timezone.now()
-                    bank_account.save()
 
-                except Exception as account_error:
-                    error_msg = f"Error refreshing {bank_account.account_name}: {str(account_error)}"
-                    refresh_errors.append(error_msg)
-                    continue
+            if _wants_background(request):
+                return _enqueue_sync_response(user, bank_accounts, refresh=True)
+            
+            all_new_transactions, refresh_errors = _sync_now(
+                user, bank_accounts, refresh=True
+            )
+            for transaction_data in all_new_transactions:
+                transaction_data["is_new"] = True
 
             all_new_transactions.sort(key=lambda x: x.get("date_paid") or x.get("authorized_date"), reverse=True)
 
@@ -563,11 +699,35 @@ class RefreshTransactions(APIView):
             return Response({"error": str(e)}, status=s.HTTP_400_BAD_REQUEST)
 
 
+class SyncJobStatus(APIView):
+    @clerk_auth_required
+    def get(self, request, job_id):
+        try:
+            job = SyncJob.objects.prefetch_related("accounts__bank_account").get(
+                id=job_id, user=request.budgetbox_user
+            )
+        except SyncJob.DoesNotExist:
+            return Response(
+                {"error": "Sync job not found"},
+                status=s.HTTP_404_NOT_FOUND
+            )
+        return Response(SyncJobSerializer(job).data)
+
+
+class PlaidClientStats(APIView):
+    @clerk_auth_required
+    def get(self, request):
+        """Per-operation Plaid latency histograms, errors and retries for this process (staff only)."""
+        if not request.budgetbox_user.is_staff:
+            return Response({"error": "Forbidden"}, status=s.HTTP_403_FORBIDDEN)
+        return Response(plaid_client.metrics.as_dict())
+
+
 class UnlinkBankAccount(APIView):
     @clerk_auth_required
     def post(self, request):
         try:
-            user = User.objects.get(clerk_user_id=request.clerk_user_id)
+            user = request.budgetbox_user
             
             bank_accounts = user.bank_accounts.filter(is_active=True)
             
@@ -580,6 +740,7 @@ class UnlinkBankAccount(APIView):
             removed_accounts = []
             removed_transactions_count = 0
             plaid_errors = []
+            scopes = {TRANSACTIONS_SCOPE}
             
             for bank_account in bank_accounts:
                 try:
@@ -596,7 +757,14 @@ class UnlinkBankAccount(APIView):
                     transaction_count = bank_account.transactions.count()
                     removed_transactions_count += transaction_count
                     
-                    bank_account.transactions.all().delete()
+                    deltas = RollupDeltas()
+                    with db_transaction.atomic():
+                        deltas.remove_queryset(bank_account.transactions.all())
+                        if bump_linked_budget_versions(bank_account.transactions.all()):
+                            scopes.add(BUDGET_SCOPE)
+                        bank_account.transactions.all().delete()
+                        apply_rollup_deltas(user.id, deltas)
+                        bump_transaction_list_version(user.id)
                     
                     account_info = {
                         "id": bank_account.id,
@@ -614,6 +782,8 @@ class UnlinkBankAccount(APIView):
                     plaid_errors.append(error_msg)
                     continue
             
+            invalidate_user_cache(user.id, *scopes)
+            
             response_data = {
                 "message": f"Successfully unlinked {len(removed_accounts)} bank account(s)",
                 "removed_accounts": removed_accounts,
@@ -627,10 +797,5 @@ class UnlinkBankAccount(APIView):
             
             return Response(response_data, status=s.HTTP_200_OK)
             
-        except User.DoesNotExist:
-            return Response(
-                {"error": "User not found"},
-                status=s.HTTP_404_NOT_FOUND
-            )
         except Exception as e:
             return Response({"error": str(e)}, status=s.HTTP_400_BAD_REQUEST)